@@ -3,8 +3,18 @@ set -e
 
 echo "Initializing database..."
 python -m src.db.db_session
+python -m src.db.migrations
+
+echo "Building game catalogue..."
+export GAME_CATALOGUE_PATH=${GAME_CATALOGUE_PATH:-/tmp/game_catalogue.bin}
+python -m src.tasks.build_game_catalogue
 
 echo "Starting FastAPI application..."
+# workers share metric samples through this directory; stale files from a
+# previous run would be summed into the new one
+export PROMETHEUS_MULTIPROC_DIR=${PROMETHEUS_MULTIPROC_DIR:-/tmp/prometheus}
+rm -rf "$PROMETHEUS_MULTIPROC_DIR"
+mkdir -p "$PROMETHEUS_MULTIPROC_DIR"
 WORKERS=${WORKERS:-2}
 TIMEOUT_GRACEFUL_SHUTDOWN=${TIMEOUT_GRACEFUL_SHUTDOWN:-30}
 
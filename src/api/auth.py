@@ -1,32 +1,74 @@
 import json
+import math
 from typing import Annotated
 
-from fastapi import APIRouter, HTTPException, Response, status
+from fastapi import APIRouter, HTTPException, Request, Response, status
 from fastapi.params import Depends
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.api_models import CurrentUserResponse, LoginRequest, LoginResponse
+from src.config import (
+    LOGIN_ATTEMPTS_PER_IP,
+    LOGIN_ATTEMPTS_PER_USERNAME,
+    LOGIN_ATTEMPTS_WINDOW_SECONDS,
+)
 from src.db.db_models import BonusCard, DiceRoll, User
 from src.db.db_session import get_db
 from src.utils.auth import get_current_user
-from src.utils.jwt import create_access_token, verify_password
+from src.utils.jwt import create_access_token, verify_password_async
+from src.utils.rate_limit import AttemptLimiter
 
 router = APIRouter(tags=["auth"])
 
+# keyed with the client IP too, so nobody can lock a player out from elsewhere
+login_attempts_by_username_ip = AttemptLimiter(
+    LOGIN_ATTEMPTS_PER_USERNAME, LOGIN_ATTEMPTS_WINDOW_SECONDS
+)
+login_attempts_by_ip = AttemptLimiter(
+    LOGIN_ATTEMPTS_PER_IP, LOGIN_ATTEMPTS_WINDOW_SECONDS
+)
+
 
 @router.post("/api/login", response_model=LoginResponse)
 async def login(
     request: LoginRequest,
+    http_request: Request,
     db: Annotated[AsyncSession, Depends(get_db)],
 ):
-    query = await db.execute(select(User).filter(User.username == request.username))
-    user = query.scalars().first()
-    if not user or not verify_password(request.password, user.password_hash):
+    # checked before any hashing, so guessing costs the server nothing once
+    # a username or address runs out of attempts
+    client_ip = http_request.client.host if http_request.client else ""
+    username_ip = f"{request.username} {client_ip}"
+    retry_after = max(
+        login_attempts_by_username_ip.retry_after(username_ip),
+        login_attempts_by_ip.retry_after(client_ip),
+    )
+    if retry_after > 0:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Too many login attempts",
+            headers={"Retry-After": str(math.ceil(retry_after))},
+        )
+    login_attempts_by_username_ip.hit(username_ip)
+    login_attempts_by_ip.hit(client_ip)
+
+    query = await db.execute(
+        select(User.password_hash).filter(User.username == request.username)
+    )
+    password_hash = query.scalars().first()
+    # hand the connection back to the pool while the hash is checked, so a
+    # burst of logins does not hold every connection other requests need
+    await db.rollback()
+    if password_hash is None or not await verify_password_async(
+        request.password, password_hash
+    ):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid credentials"
         )
-    token = create_access_token({"sub": user.username})
+    login_attempts_by_username_ip.reset(username_ip)
+    login_attempts_by_ip.reset(client_ip)
+    token = create_access_token({"sub": request.username})
     return {"token": token}
 
 
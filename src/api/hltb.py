@@ -1,153 +1,62 @@
 from typing import Annotated
 
-from fastapi import APIRouter, Body, Depends, HTTPException
-from sqlalchemy import and_, func, or_, select
+from fastapi import APIRouter, Body, Depends
+from pydantic import TypeAdapter
+from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.api_models import (
+    HltbGameCompact,
     HltbGameResponse,
     HltbGamesListResponse,
     HltbRandomGameRequest,
 )
 from src.db.db_models import HltbGame
-from src.db.db_session import get_db
+from src.db.db_session import get_read_db
+from src.utils.hltb_index import get_hltb_index
+from src.utils.responses import ORJSONModelResponse
 
 router = APIRouter(tags=["hltb"])
 
+HLTB_IMAGE_URL = "https://howlongtobeat.com/games/"
+HLTB_GAME_MODELS: dict[str, type[HltbGameResponse | HltbGameCompact]] = {
+    "full": HltbGameResponse,
+    "compact": HltbGameCompact,
+}
+HLTB_GAME_LIST_ADAPTERS = {
+    name: TypeAdapter(list[model]) for name, model in HLTB_GAME_MODELS.items()
+}
+
 
 @router.post("/api/hltb/random-game", response_model=HltbGamesListResponse)
 async def get_random_game(
-    db: Annotated[AsyncSession, Depends(get_db)],
+    db: Annotated[AsyncSession, Depends(get_read_db)],
     request: HltbRandomGameRequest = Body(...),
 ):
+    min_length_seconds, max_length_seconds = 0, None
     if request.min_length is not None and request.max_length is not None:
-        min_length_seconds = request.min_length * 3600
-        max_length_seconds = request.max_length * 3600
-
-        if min_length_seconds == 0 and max_length_seconds == 0:
-            query = (
-                select(HltbGame)
-                .where(
-                    and_(
-                        HltbGame.profile_platform.like("%PC%"),
-                        HltbGame.game_type == "game",
-                    )
-                )
-                .order_by(func.random())
-                .limit(request.limit)
-            )
-        else:
-            include_unknown = min_length_seconds == 0 and max_length_seconds > 0
-            base_conditions = [
-                and_(
-                    HltbGame.comp_main > 0,
-                    HltbGame.comp_main >= min_length_seconds,
-                    HltbGame.comp_main <= max_length_seconds,
-                ),
-                and_(
-                    HltbGame.comp_main == 0,
-                    HltbGame.comp_plus > 0,
-                    HltbGame.comp_plus >= min_length_seconds,
-                    HltbGame.comp_plus <= max_length_seconds,
-                ),
-                and_(
-                    HltbGame.comp_main == 0,
-                    HltbGame.comp_plus == 0,
-                    HltbGame.comp_100 > 0,
-                    HltbGame.comp_100 >= min_length_seconds,
-                    HltbGame.comp_100 <= max_length_seconds,
-                ),
-                and_(
-                    HltbGame.comp_main == 0,
-                    HltbGame.comp_plus == 0,
-                    HltbGame.comp_100 == 0,
-                    HltbGame.comp_all > 0,
-                    HltbGame.comp_all >= min_length_seconds,
-                    HltbGame.comp_all <= max_length_seconds,
-                ),
-            ]
-            if include_unknown:
-                base_conditions.append(
-                    and_(
-                        HltbGame.comp_main == 0,
-                        HltbGame.comp_plus == 0,
-                        HltbGame.comp_100 == 0,
-                        HltbGame.comp_all == 0,
-                    )
-                )
-
-            query = (
-                select(HltbGame)
-                .where(
-                    and_(
-                        HltbGame.profile_platform.like("%PC%"),
-                        HltbGame.game_type == "game",
-                        or_(*base_conditions),
-                    )
-                )
-                .order_by(func.random())
-                .limit(request.limit)
-            )
-    else:
-        query = (
-            select(HltbGame)
-            .where(
-                and_(
-                    HltbGame.profile_platform.like("%PC%"),
-                    HltbGame.game_type == "game",
-                )
-            )
-            .order_by(func.random())
-            .limit(request.limit)
-        )
-
-    result = await db.execute(query)
-    games = result.scalars().all()
-
-    if not games:
-        return HltbGamesListResponse(games=[])
-
-    games_response = []
-    for game in games:
-        game_response = HltbGameResponse(
-            game_id=game.game_id,
-            game_name=game.game_name,
-            game_name_date=game.game_name_date,
-            game_alias=game.game_alias,
-            game_type=game.game_type,
-            game_image=f"https://howlongtobeat.com/games/{game.game_image}",
-            comp_lvl_combine=game.comp_lvl_combine,
-            comp_lvl_sp=game.comp_lvl_sp,
-            comp_lvl_co=game.comp_lvl_co,
-            comp_lvl_mp=game.comp_lvl_mp,
-            comp_main=game.comp_main,
-            comp_plus=game.comp_plus,
-            comp_100=game.comp_100,
-            comp_all=game.comp_all,
-            comp_main_count=game.comp_main_count,
-            comp_plus_count=game.comp_plus_count,
-            comp_100_count=game.comp_100_count,
-            comp_all_count=game.comp_all_count,
-            invested_co=game.invested_co,
-            invested_mp=game.invested_mp,
-            invested_co_count=game.invested_co_count,
-            invested_mp_count=game.invested_mp_count,
-            count_comp=game.count_comp,
-            count_speedrun=game.count_speedrun,
-            count_backlog=game.count_backlog,
-            count_review=game.count_review,
-            review_score=game.review_score,
-            count_playing=game.count_playing,
-            count_retired=game.count_retired,
-            profile_platform=game.profile_platform,
-            profile_popular=game.profile_popular,
-            release_world=game.release_world,
-            genres=game.genres,
-            steam_id=game.steam_id,
-            description=game.description,
-            created_at=game.created_at,
-            updated_at=game.updated_at,
+        # 0-0 means any length; a 0 minimum also keeps games of unknown length,
+        # which have an effective length of 0
+        if request.min_length != 0 or request.max_length != 0:
+            min_length_seconds = request.min_length * 3600
+            max_length_seconds = request.max_length * 3600
+
+    index = await get_hltb_index(db)
+    game_ids = index.sample(min_length_seconds, max_length_seconds, request.limit)
+    model = HLTB_GAME_MODELS[request.fields]
+    columns = [HltbGame.__table__.c[name] for name in model.model_fields]
+    result = await db.execute(select(*columns).where(HltbGame.game_id.in_(game_ids)))
+    rows_by_id = {row["game_id"]: row for row in result.mappings()}
+
+    games = []
+    for game_id in game_ids:
+        row = rows_by_id.get(game_id)
+        if row is not None:
+            games.append({**row, "game_image": HLTB_IMAGE_URL + row["game_image"]})
+
+    # validated in one call, skipping the response_model round trip
+    return ORJSONModelResponse(
+        HltbGamesListResponse.model_construct(
+            games=HLTB_GAME_LIST_ADAPTERS[request.fields].validate_python(games)
         )
-        games_response.append(game_response)
-
-    return HltbGamesListResponse(games=games_response)
+    )
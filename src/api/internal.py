@@ -1,6 +1,8 @@
+import asyncio
+import os
 from typing import Annotated
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Response, status
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
@@ -10,6 +12,9 @@ from src.api_models import (
     CreateNotificationResponse,
     CreatePlayerMessageNotificationRequest,
     CreatePlayerNotificationRequest,
+    ProfileCapture,
+    ProfileCaptureListResponse,
+    ProfileSqlStatement,
     SetEventEndTimeRequest,
     StreamCheckResponse,
     UpdatePlayerInternalRequest,
@@ -24,6 +29,12 @@ from src.db.queries.notifications import (
 )
 from src.enums import BonusCardStatus, NotificationEventType, NotificationType, Role
 from src.utils.auth import get_current_user, get_current_user_direct
+from src.utils.profiling import (
+    capture_report_path,
+    list_captures,
+    read_capture,
+    read_capture_report,
+)
 
 router = APIRouter(tags=["internal"])
 
@@ -411,3 +422,72 @@ async def update_player_internal(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Failed to update player: {str(e)}",
         )
+
+
+async def get_profile_capture(capture_id: str) -> dict:
+    capture = await asyncio.to_thread(read_capture, capture_id)
+    if capture is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Profile {capture_id} not found",
+        )
+    return capture
+
+
+@router.get("/api/internal/profiles", response_model=ProfileCaptureListResponse)
+async def get_profiles(
+    current_user: Annotated[User, Depends(get_current_user_direct)],
+):
+    if current_user.role != Role.ADMIN.value:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only admins can perform this action",
+        )
+
+    captures = await asyncio.to_thread(list_captures)
+    return ProfileCaptureListResponse(captures=captures)
+
+
+@router.get("/api/internal/profiles/{capture_id}")
+async def download_profile(
+    capture_id: str,
+    current_user: Annotated[User, Depends(get_current_user_direct)],
+):
+    if current_user.role != Role.ADMIN.value:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only admins can perform this action",
+        )
+
+    capture_data = await get_profile_capture(capture_id)
+    capture = ProfileCapture.model_validate(capture_data["capture"])
+    report = await asyncio.to_thread(read_capture_report, capture)
+    if report is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Profile {capture_id} not found",
+        )
+    filename = os.path.basename(capture_report_path(capture))
+    return Response(
+        content=report,
+        media_type="text/html" if filename.endswith(".html") else "text/plain",
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+
+@router.get(
+    "/api/internal/profiles/{capture_id}/sql",
+    response_model=list[ProfileSqlStatement],
+)
+async def get_profile_sql(
+    capture_id: str,
+    current_user: Annotated[User, Depends(get_current_user_direct)],
+):
+    if current_user.role != Role.ADMIN.value:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only admins can perform this action",
+        )
+
+    capture = await get_profile_capture(capture_id)
+    return capture["sql"]
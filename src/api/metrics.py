@@ -0,0 +1,33 @@
+import hmac
+from typing import Annotated
+
+from fastapi import APIRouter, Depends, HTTPException, Response, status
+from fastapi.security import HTTPAuthorizationCredentials
+
+from src.config import METRICS_TOKEN
+from src.enums import Role
+from src.utils.auth import get_principal, security
+from src.utils.metrics import render_metrics
+
+router = APIRouter(tags=["metrics"])
+
+
+async def may_read_metrics(token: str) -> bool:
+    if METRICS_TOKEN and hmac.compare_digest(token.encode(), METRICS_TOKEN.encode()):
+        return True
+    principal = await get_principal(token)
+    return principal is not None and principal.role == Role.ADMIN.value
+
+
+@router.get("/metrics", include_in_schema=False)
+async def get_metrics(
+    credentials: Annotated[HTTPAuthorizationCredentials, Depends(security)],
+):
+    if not await may_read_metrics(credentials.credentials):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only admins and the metrics scraper can read metrics",
+        )
+
+    content, media_type = render_metrics()
+    return Response(content=content, media_type=media_type)
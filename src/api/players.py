@@ -24,6 +24,8 @@ from src.api_models import (
     ScoreChangeEvent,
     UpdatePlayerRequest,
     UpdatePlayerTurnStateRequest,
+    ViewerSample,
+    ViewerSeriesResponse,
 )
 from src.api_models import (
     PlayerGame as PlayerGameApiModel,
@@ -34,6 +36,7 @@ from src.consts import (
     DROP_SCORE_LOST_MINIMUM,
     DROP_SCORE_LOST_PERCENT,
     GAME_LENGTHS_IN_ORDER,
+    MAX_VIEWER_SERIES_POINTS,
     PARKING_SECTOR_ID,
     SCORE_BONUS_PER_MAP_COMPLETION,
     SCORES_BY_GAME_LENGTH,
@@ -52,7 +55,7 @@ from src.db.db_models import (
 from src.db.db_models import (
     PlayerGame as PlayerGameDbModel,
 )
-from src.db.db_session import get_db
+from src.db.db_session import get_db, get_read_db
 from src.db.queries.category_history import (
     calculate_game_duration_by_title,
     get_current_game_duration,
@@ -63,7 +66,9 @@ from src.db.queries.notifications import (
     create_game_drop_notification,
     create_game_reroll_notification,
 )
+from src.db.queries.player_games import track_completed_title_change
 from src.db.queries.players import change_player_score
+from src.db.queries.viewer_samples import get_viewer_samples
 from src.enums import (
     BonusCardStatus,
     GameCompletionType,
@@ -87,12 +92,15 @@ from src.utils.common import (
     get_sector_score_multiplier,
 )
 from src.utils.db import utc_now_ts
+from src.utils.game_names import game_key
+from src.utils.responses import ORJSONModelResponse
+from src.utils.timeseries import SECONDS_PER_DAY, lttb
 
 router = APIRouter(tags=["players"])
 
 
 @router.get("/api/players", response_model=PlayerListResponse)
-async def get_players(db: Annotated[AsyncSession, Depends(get_db)]):
+async def get_players(db: Annotated[AsyncSession, Depends(get_read_db)]):
     players_query = await db.execute(
         select(User)
         .filter(User.is_active == 1)
@@ -206,13 +214,15 @@ async def get_players(db: Annotated[AsyncSession, Depends(get_db)]):
     prison_cards = prison_query.scalars().all()
     prison_cards_bonuses = [MainBonusCardType(card.card_type) for card in prison_cards]
 
-    return PlayerListResponse(players=users_models, prison_cards=prison_cards_bonuses)
+    return ORJSONModelResponse(
+        PlayerListResponse(players=users_models, prison_cards=prison_cards_bonuses)
+    )
 
 
 @router.get("/api/players/{player_id}/events", response_model=PlayerEventsResponse)
 async def get_player_events(
     player_id: int,
-    db: Annotated[AsyncSession, Depends(get_db)],
+    db: Annotated[AsyncSession, Depends(get_read_db)],
 ):
     moves_query = await db.execute(
         select(PlayerMove).where(PlayerMove.player_id == player_id)
@@ -335,7 +345,37 @@ async def get_player_events(
         score_change_events.append(event)
 
     all_events = chain(move_events, game_events, bonus_card_events, score_change_events)
-    return {"events": all_events}
+    # every event was validated when it was built
+    return ORJSONModelResponse(
+        PlayerEventsResponse.model_construct(events=list(all_events))
+    )
+
+
+@router.get("/api/players/{player_id}/viewers", response_model=ViewerSeriesResponse)
+async def get_player_viewers(
+    player_id: int,
+    db: Annotated[AsyncSession, Depends(get_read_db)],
+    start_ts: int | None = None,
+    end_ts: int | None = None,
+    points: int = 300,
+):
+    if points < 3 or points > MAX_VIEWER_SERIES_POINTS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"points must be between 3 and {MAX_VIEWER_SERIES_POINTS}",
+        )
+
+    end_ts = end_ts if end_ts is not None else utc_now_ts()
+    start_ts = start_ts if start_ts is not None else end_ts - SECONDS_PER_DAY
+    samples = await get_viewer_samples(db, player_id, start_ts, end_ts)
+
+    return ViewerSeriesResponse(
+        player_id=player_id,
+        samples=[
+            ViewerSample(timestamp=timestamp, viewers=viewers)
+            for timestamp, viewers in lttb(samples, points)
+        ],
+    )
 
 
 @router.post("/api/players/current/moves", response_model=PlayerMoveResponse)
@@ -545,6 +585,7 @@ async def save_player_game(
         item_length_bonus=0,
     )
     db.add(game)
+    track_completed_title_change(db, current_user.id, request.title)
 
     if (
         request.difficulty_level
@@ -724,7 +765,11 @@ async def edit_player_game(
             detail="You don't have permission to edit this game.",
         )
 
+    track_completed_title_change(
+        db, game.player_id, request.game_title, old_title=game.item_title
+    )
     game.item_title = request.game_title
+    game.game_key = game_key(request.game_title)
     game.item_review = request.game_review
     game.item_rating = request.rating
     game.vod_links = request.vod_links or ""
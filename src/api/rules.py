@@ -6,7 +6,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.api_models import NewRulesVersionRequest, RulesResponse
 from src.db.db_models import Rules, User
-from src.db.db_session import get_db
+from src.db.db_session import get_db, get_read_db
 from src.enums import Role
 from src.utils.auth import get_current_user
 
@@ -15,7 +15,7 @@ router = APIRouter(tags=["rules"])
 
 @router.get("/api/rules/current", response_model=RulesResponse)
 async def get_current_rules_version(
-    db: Annotated[AsyncSession, Depends(get_db)],
+    db: Annotated[AsyncSession, Depends(get_read_db)],
 ):
     subquery = (
         select(Rules.category, func.max(Rules.id).label("latest_id"))
@@ -35,7 +35,7 @@ async def get_current_rules_version(
 
 @router.get("/api/rules", response_model=RulesResponse)
 async def get_all_rules_versions(
-    db: Annotated[AsyncSession, Depends(get_db)],
+    db: Annotated[AsyncSession, Depends(get_read_db)],
 ):
     rules_query = await db.execute(select(Rules).order_by(Rules.created_at.desc()))
     rules = rules_query.scalars().all()
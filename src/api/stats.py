@@ -20,7 +20,7 @@ from src.db.db_models import (
     User,
     IgdbGame,
 )
-from src.db.db_session import get_db
+from src.db.db_session import get_read_db
 from src.enums import (
     BonusCardStatus,
     GameCompletionType,
@@ -29,13 +29,14 @@ from src.enums import (
 )
 from src.consts import INSTANT_CARD_TYPES, SCORES_BY_GAME_LENGTH
 from src.utils.common import get_prison_user
+from src.utils.responses import ORJSONModelResponse
 
 router = APIRouter(tags=["stats"])
 
 
 @router.get("/api/stats", response_model=PlayerStatsResponse)
 async def get_player_stats(
-    db: Annotated[AsyncSession, Depends(get_db)],
+    db: Annotated[AsyncSession, Depends(get_read_db)],
 ):
     players_query = await db.execute(
         select(User).filter(User.is_active == 1, User.sector_id.is_not(None))
@@ -209,7 +210,7 @@ async def get_player_stats(
 
 @router.get("/api/stats/final", response_model=FinalStatsResponse)
 async def get_final_stats(
-    db: Annotated[AsyncSession, Depends(get_db)],
+    db: Annotated[AsyncSession, Depends(get_read_db)],
 ):
     active_players_query = await db.execute(
         select(User).filter(User.is_active == 1, User.sector_id.is_not(None))
@@ -368,17 +369,19 @@ async def get_final_stats(
             if igdb_game:
                 stats.worst_rated_game.cover = igdb_game.cover
 
-    return FinalStatsResponse(
-        total_score=total_score,
-        completed_games=completed_games,
-        dice_rolls=dice_rolls,
-        hours_spent_on_games=round(hours_spent_on_games, 2),
-        cards_received=cards_received,
-        cards_used=cards_used,
-        maps_completed=maps_completed,
-        games_dropped=total_games_dropped,
-        games_rerolled=total_games_rerolled,
-        train_rides=train_rides,
-        average_rating_of_completed_games=average_rating_of_completed_games,
-        players=player_stats_list,
+    return ORJSONModelResponse(
+        FinalStatsResponse(
+            total_score=total_score,
+            completed_games=completed_games,
+            dice_rolls=dice_rolls,
+            hours_spent_on_games=round(hours_spent_on_games, 2),
+            cards_received=cards_received,
+            cards_used=cards_used,
+            maps_completed=maps_completed,
+            games_dropped=total_games_dropped,
+            games_rerolled=total_games_rerolled,
+            train_rides=train_rides,
+            average_rating_of_completed_games=average_rating_of_completed_games,
+            players=player_stats_list,
+        )
     )
@@ -85,7 +85,7 @@ async def pay_tax(
             player = next((p for p in players if p.id == game.player_id), None)
             if not player:
                 logger.error(
-                    f"Player with ID {game.player_id} not found for game {game.id}"
+                    "Player with ID %s not found for game %s", game.player_id, game.id
                 )
                 continue
 
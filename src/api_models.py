@@ -175,6 +175,16 @@ class PlayerEventsResponse(BaseModel):
     events: list[GameEvent | BonusCardEvent | ScoreChangeEvent | MoveEvent]
 
 
+class ViewerSample(BaseModel):
+    timestamp: int
+    viewers: int
+
+
+class ViewerSeriesResponse(BaseModel):
+    player_id: int
+    samples: list[ViewerSample]
+
+
 class GiveBonusCardRequest(BaseModel):
     bonus_type: MainBonusCardType
 
@@ -323,10 +333,23 @@ class HltbGameResponse(BaseModel):
     updated_at: int
 
 
+class HltbGameCompact(BaseModel):
+    game_id: int
+    game_name: str
+    game_image: str
+    comp_main: int
+    comp_plus: int
+    comp_100: int
+    comp_all: int
+    release_world: int | None = None
+
+
 class HltbRandomGameRequest(BaseModel):
     min_length: int | None = None
     max_length: int | None = None
     limit: int = Field(default=12, ge=1, le=16)
+    # "compact" returns HltbGameCompact, enough for the game wheel
+    fields: Literal["full", "compact"] = "full"
 
     @field_validator("min_length", "max_length")
     @classmethod
@@ -351,7 +374,7 @@ class HltbRandomGameRequest(BaseModel):
 
 
 class HltbGamesListResponse(BaseModel):
-    games: list[HltbGameResponse]
+    games: list[HltbGameResponse] | list[HltbGameCompact]
 
 
 class StealBonusCardRequest(BaseModel):
@@ -372,6 +395,28 @@ class StreamCheckResponse(BaseModel):
     stats: dict
 
 
+class ProfileSqlStatement(BaseModel):
+    statement: str
+    duration_ms: float
+
+
+class ProfileCapture(BaseModel):
+    id: str
+    request_id: str | None
+    method: str
+    path: str
+    status: int
+    duration_ms: float
+    created_at: int
+    profiler: str
+    sql_statements: int
+    sql_time_ms: float
+
+
+class ProfileCaptureListResponse(BaseModel):
+    captures: list[ProfileCapture]
+
+
 class RollDiceRequest(BaseModel):
     num: int = 2
     min: int = 1
@@ -1,4 +1,3 @@
-import logging
 import os
 
 ENV = os.getenv("ENV", "local")
@@ -7,6 +6,12 @@ DB_URL = os.getenv("DB_URL", "")
 IS_LOCAL = ENV == "local"
 
 DATABASE_URL = "sqlite+aiosqlite:///./test.db" if IS_LOCAL else DB_URL
+# replica for read-only requests; empty reads from the primary
+DB_READ_URL = os.getenv("DB_READ_URL", "")
+# issue SET TRANSACTION READ ONLY at the start of read-only requests
+DB_READ_ONLY_TRANSACTIONS = (
+    os.getenv("DB_READ_ONLY_TRANSACTIONS", "false").lower() == "true"
+)
 
 TOKEN_SECRET_KEY = os.getenv("SECRET_KEY", "your-secret-key")
 
@@ -14,11 +19,45 @@ SAVE_STREAM_CATEGORIES = os.getenv("SAVE_STREAM_CATEGORIES", "true").lower() ==
 
 RANDOM_ORG_API_KEY = os.getenv("RANDOM_ORG_API_KEY", "")
 
-def setup_logging():
-    logging.basicConfig(
-        level=logging.INFO,
-        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-        handlers=[
-            logging.StreamHandler()
-        ]
-    )
+TWITCH_API_URL = os.getenv("TWITCH_API_URL", "https://api.twitch.tv/helix")
+KICK_API_URL = os.getenv("KICK_API_URL", "https://kick.com/api/v1")
+
+# "memory" (trigram index kept by each worker) or "sql" (ILIKE scan)
+IGDB_SEARCH_BACKEND = os.getenv("IGDB_SEARCH_BACKEND", "memory")
+
+# binary copy of igdb_games/hltb_games mapped by every worker; empty keeps the
+# index in each process
+GAME_CATALOGUE_PATH = os.getenv("GAME_CATALOGUE_PATH", "")
+
+# bcrypt runs in this many threads per worker, off the event loop
+PASSWORD_HASH_THREADS = int(os.getenv("PASSWORD_HASH_THREADS", "2"))
+# bcrypt jobs a worker accepts at once, running or waiting for a thread; past
+# this a login gets a 503 instead of queueing for seconds
+PASSWORD_HASH_MAX_PENDING = int(os.getenv("PASSWORD_HASH_MAX_PENDING", "64"))
+# login attempts allowed within the window per username from one client IP,
+# and per client IP over all usernames. Each worker counts on its own, so with
+# N uvicorn workers a client gets up to N times these before every worker
+# refuses it
+LOGIN_ATTEMPTS_PER_USERNAME = int(os.getenv("LOGIN_ATTEMPTS_PER_USERNAME", "5"))
+LOGIN_ATTEMPTS_PER_IP = int(os.getenv("LOGIN_ATTEMPTS_PER_IP", "20"))
+LOGIN_ATTEMPTS_WINDOW_SECONDS = 60
+
+# warn when one statement shape runs more than this many times in a request
+SQL_REPEAT_WARN_THRESHOLD = int(os.getenv("SQL_REPEAT_WARN_THRESHOLD", "10"))
+# "json" writes one object per line for the log collector, "text" is for
+# reading in a terminal
+LOG_FORMAT = os.getenv("LOG_FORMAT", "text" if IS_LOCAL else "json")
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+# records logged with a sample_key get through once per key per window
+LOG_SAMPLE_WINDOW_SECONDS = int(os.getenv("LOG_SAMPLE_WINDOW_SECONDS", "300"))
+# how much of an error response body gets logged
+LOG_ERROR_BODY_BYTES = int(os.getenv("LOG_ERROR_BODY_BYTES", "2048"))
+# responses smaller than this are sent uncompressed
+COMPRESSION_MIN_BYTES = int(os.getenv("COMPRESSION_MIN_BYTES", "1024"))
+# bearer token the Prometheus scraper sends to /metrics; admins can read it
+# with their own token either way
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
+# admin requests sent with X-Profile: 1 are profiled into this directory,
+# which keeps the last PROFILE_RING_SIZE captures
+PROFILE_DIR = os.getenv("PROFILE_DIR", "/tmp/igropolius-profiles")
+PROFILE_RING_SIZE = int(os.getenv("PROFILE_RING_SIZE", "20"))
@@ -57,6 +57,8 @@ BONUS_SECTORS = {3, 8, 13, 18, 23, 29, 34, 39}
 
 FIRST_DAY_SECONDS = 60 * 60 * 12  # 12 hours in seconds
 
+MAX_VIEWER_SERIES_POINTS = 2000
+
 
 SECTOR_SCORE_MULTIPLIERS = {
     START_SECTOR_ID: 1.5,
@@ -1,5 +1,5 @@
 # models.py
-from sqlalchemy import Float, Integer, String, Text
+from sqlalchemy import Float, Index, Integer, LargeBinary, String, Text, event, inspect
 from sqlalchemy.orm import (
     Mapped,
     mapped_column,  # pyright: ignore[reportAttributeAccessIssue]
@@ -8,10 +8,20 @@ from sqlalchemy.orm.decl_api import declarative_base
 
 from src.enums import BonusCardStatus, PlayerTurnState, Role, StreamPlatform
 from src.utils.db import utc_now_ts
+from src.utils.game_names import game_key
+from src.utils.hltb import effective_length, is_pc_platform
 
 DbBase = declarative_base()
 
 
+def game_key_default(title_column: str):
+    # fills game_key from the row's title on insert; updates set it explicitly
+    def default(context) -> str:
+        return game_key(context.get_current_parameters()[title_column])
+
+    return default
+
+
 class User(DbBase):
     __tablename__ = "users"
 
@@ -65,6 +75,7 @@ class User(DbBase):
 
 class PlayerGame(DbBase):
     __tablename__ = "player_games"
+    __table_args__ = (Index("ix_player_games_sector_id_type", "sector_id", "type"),)
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
     created_at: Mapped[int] = mapped_column(Integer, default=utc_now_ts)
@@ -85,6 +96,9 @@ class PlayerGame(DbBase):
     player_sector_id: Mapped[int] = mapped_column(Integer, nullable=False)
     difficulty_level: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
     score_change_id: Mapped[int | None] = mapped_column(Integer, nullable=True)
+    game_key: Mapped[str | None] = mapped_column(
+        String(255), nullable=True, index=True, default=game_key_default("item_title")
+    )
 
 
 class PlayerScoreChange(DbBase):
@@ -110,6 +124,14 @@ class PlayerScoreChange(DbBase):
 
 class PlayerCard(DbBase):
     __tablename__ = "player_cards"
+    __table_args__ = (
+        Index(
+            "ix_player_cards_player_id_status_card_type",
+            "player_id",
+            "status",
+            "card_type",
+        ),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
     created_at: Mapped[int] = mapped_column(Integer, default=utc_now_ts)
@@ -139,6 +161,10 @@ class PlayerCard(DbBase):
 
 class PlayerMove(DbBase):
     __tablename__ = "player_moves"
+    __table_args__ = (
+        # latest moves of a type per player, read newest first by id
+        Index("ix_player_moves_player_id_move_type_id", "player_id", "move_type", "id"),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
     created_at: Mapped[int] = mapped_column(Integer, default=utc_now_ts)
@@ -168,24 +194,71 @@ class Rules(DbBase):
 
 class IgdbGame(DbBase):
     __tablename__ = "igdb_games"
+    __table_args__ = (
+        # MAX(updated_at) is the change marker the search index checks
+        Index("ix_igdb_games_updated_at", "updated_at"),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
     name: Mapped[str] = mapped_column(Text, nullable=False)
     cover: Mapped[str] = mapped_column(Text, nullable=True)
     release_year: Mapped[int] = mapped_column(Integer, nullable=True)
+    game_key: Mapped[str | None] = mapped_column(
+        String(255), nullable=True, index=True, default=game_key_default("name")
+    )
+    updated_at: Mapped[int] = mapped_column(
+        Integer, default=utc_now_ts, onupdate=utc_now_ts
+    )
 
 
 class CategoryHistory(DbBase):
     __tablename__ = "categories_history"
+    __table_args__ = (
+        # latest record of a game, or of any game whose key starts with a
+        # prefix, is a seek on the first two columns in category_date order
+        Index(
+            "ix_categories_history_player_key_date",
+            "player_id",
+            "game_key",
+            "category_date",
+        ),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
     category_name: Mapped[str] = mapped_column(String(255), nullable=False)
     player_id: Mapped[int] = mapped_column(Integer, nullable=False, index=True)
     category_date: Mapped[int] = mapped_column(Integer, default=utc_now_ts)
+    game_key: Mapped[str | None] = mapped_column(
+        String(255), nullable=True, default=game_key_default("category_name")
+    )
+
+
+class ViewerSamples(DbBase):
+    __tablename__ = "viewer_samples"
+    __table_args__ = (
+        Index("ix_viewer_samples_player_id_day", "player_id", "day", unique=True),
+    )
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
+    player_id: Mapped[int] = mapped_column(Integer, nullable=False)
+    day: Mapped[int] = mapped_column(Integer, nullable=False)
+    first_ts: Mapped[int] = mapped_column(Integer, nullable=False)
+    last_ts: Mapped[int] = mapped_column(Integer, nullable=False)
+    last_value: Mapped[int] = mapped_column(Integer, nullable=False)
+    sample_count: Mapped[int] = mapped_column(Integer, nullable=False)
+    # little-endian int32 pairs of (seconds since previous sample, viewer delta).
+    # MEDIUMBLOB on MySQL: a plain BLOB stops at 64KB, about 8k samples a day
+    deltas: Mapped[bytes] = mapped_column(LargeBinary(length=2**24 - 1), nullable=False)
 
 
 class DiceRoll(DbBase):
     __tablename__ = "dice_rolls"
+    __table_args__ = (
+        # the player's latest unused roll
+        Index(
+            "ix_dice_rolls_player_id_used_created_at", "player_id", "used", "created_at"
+        ),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
     created_at: Mapped[int] = mapped_column(Integer, default=utc_now_ts)
@@ -215,6 +288,15 @@ class ErrorLog(DbBase):
 
 class Notification(DbBase):
     __tablename__ = "notifications"
+    __table_args__ = (
+        # the player's unread notifications, newest first
+        Index(
+            "ix_notifications_player_id_is_read_created_at",
+            "player_id",
+            "is_read",
+            "created_at",
+        ),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
     created_at: Mapped[int] = mapped_column(Integer, default=utc_now_ts)
@@ -231,8 +313,24 @@ class Notification(DbBase):
     message_text: Mapped[str | None] = mapped_column(Text, nullable=True)
 
 
+def hltb_effective_length_default(context) -> int:
+    params = context.get_current_parameters()
+    return effective_length(
+        params["comp_main"], params["comp_plus"], params["comp_100"], params["comp_all"]
+    )
+
+
+def hltb_is_pc_default(context) -> int:
+    return int(is_pc_platform(context.get_current_parameters().get("profile_platform")))
+
+
 class HltbGame(DbBase):
     __tablename__ = "hltb_games"
+    __table_args__ = (
+        Index("ix_hltb_games_type_pc_length", "game_type", "is_pc", "effective_length"),
+        # MAX(updated_at) is the change marker the length index checks
+        Index("ix_hltb_games_updated_at", "updated_at"),
+    )
 
     game_id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
     game_name: Mapped[str] = mapped_column(String(255), nullable=False)
@@ -273,6 +371,33 @@ class HltbGame(DbBase):
     updated_at: Mapped[int] = mapped_column(
         Integer, default=utc_now_ts, onupdate=utc_now_ts
     )
+    # derived from the columns above on insert, and on ORM updates by
+    # _refresh_hltb_derived_columns
+    effective_length: Mapped[int] = mapped_column(
+        Integer, nullable=False, default=hltb_effective_length_default
+    )
+    is_pc: Mapped[int] = mapped_column(
+        Integer, nullable=False, default=hltb_is_pc_default
+    )
+    game_key: Mapped[str | None] = mapped_column(
+        String(255), nullable=True, index=True, default=game_key_default("game_name")
+    )
+
+
+HLTB_LENGTH_ATTRIBUTES = ("comp_main", "comp_plus", "comp_100", "comp_all")
+
+
+@event.listens_for(HltbGame, "before_update")
+def _refresh_hltb_derived_columns(mapper, connection, target: HltbGame):
+    # a column onupdate only sees the columns being set, so comp_main changed
+    # alone couldn't be combined with the others; the instance has them all
+    attrs = inspect(target).attrs
+    if any(attrs[name].history.has_changes() for name in HLTB_LENGTH_ATTRIBUTES):
+        target.effective_length = effective_length(
+            target.comp_main, target.comp_plus, target.comp_100, target.comp_all
+        )
+    if attrs.profile_platform.history.has_changes():
+        target.is_pc = int(is_pc_platform(target.profile_platform))
 
 
 class EventSettings(DbBase):
@@ -298,3 +423,12 @@ class BonusCard(DbBase):
     card_type: Mapped[str] = mapped_column(String(255), nullable=False, unique=True)
     weight: Mapped[float] = mapped_column(Float, nullable=False, default=1.0)
     cooldown_turns: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+
+
+class SchemaMigration(DbBase):
+    __tablename__ = "schema_migrations"
+
+    # one row per migration in src/db/migrations.py applied to this database
+    version: Mapped[int] = mapped_column(Integer, primary_key=True)
+    name: Mapped[str] = mapped_column(String(255), nullable=False)
+    applied_at: Mapped[int] = mapped_column(Integer, default=utc_now_ts)
@@ -1,16 +1,23 @@
 # database.py
 import asyncio
+import logging
+import time
 from contextlib import asynccontextmanager
 
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
 from sqlalchemy.ext.asyncio import (
+    AsyncSession,
     async_sessionmaker,  # pyright: ignore[reportAttributeAccessIssue]
     create_async_engine,
 )
 
-from src.config import DATABASE_URL
+from src.config import DATABASE_URL, DB_READ_ONLY_TRANSACTIONS, DB_READ_URL
 from src.db.db_models import (
     DbBase,
 )
+from src.db.sql_stats import instrument_engine
+from src.utils.metrics import TimedAsyncAdaptedQueuePool, instrument_pool
 
 is_sqlite = DATABASE_URL.startswith("sqlite")
 
@@ -23,17 +30,30 @@ is_sqlite = DATABASE_URL.startswith("sqlite")
 #     return f"__asyncpg_{uuid4()}__"
 
 
-if is_sqlite:
-    engine = create_async_engine(
-        DATABASE_URL,
-        echo=False,
-    )
-else:
+logger = logging.getLogger(__name__)
+
+POOL_SIZE = 20
+POOL_MAX_OVERFLOW = 10
+# an unreachable replica is skipped for this long before it is tried again
+READ_REPLICA_RETRY_SECONDS = 30
+
+
+def make_engine(url: str, name: str):
+    if is_sqlite:
+        engine = create_async_engine(
+            url,
+            echo=False,
+        )
+        instrument_pool(engine, name)
+        return engine
+
     engine = create_async_engine(
-        DATABASE_URL,
+        url,
         echo=False,
-        pool_size=20,
-        max_overflow=10,
+        poolclass=TimedAsyncAdaptedQueuePool,
+        pool_logging_name=name,
+        pool_size=POOL_SIZE,
+        max_overflow=POOL_MAX_OVERFLOW,
         pool_timeout=30,
         pool_recycle=1800,
         pool_pre_ping=True,
@@ -44,7 +64,21 @@ else:
         #     "prepared_statement_name_func": make_statement_name,
         # },
     )
+    instrument_pool(engine, name, POOL_SIZE + POOL_MAX_OVERFLOW)
+    return engine
+
+
+engine = make_engine(DATABASE_URL, "primary")
+# read-only requests go to the replica when one is configured
+read_engine = (
+    make_engine(DB_READ_URL, "replica") if DB_READ_URL and not is_sqlite else engine
+)
+instrument_engine(engine.sync_engine)
+if read_engine is not engine:
+    instrument_engine(read_engine.sync_engine)
 SessionLocal = async_sessionmaker(bind=engine, expire_on_commit=False)
+ReadSessionLocal = async_sessionmaker(bind=read_engine, expire_on_commit=False)
+read_replica_failed_at = 0.0
 
 
 async def get_db():
@@ -59,6 +93,38 @@ async def get_db():
             await session.close()
 
 
+async def open_read_session() -> AsyncSession:
+    global read_replica_failed_at
+
+    if (
+        read_engine is engine
+        or time.monotonic() - read_replica_failed_at < READ_REPLICA_RETRY_SECONDS
+    ):
+        return SessionLocal()
+
+    session = ReadSessionLocal()
+    try:
+        await session.connection()
+    except (OperationalError, OSError):
+        logger.warning("Read replica unavailable, reading from the primary")
+        read_replica_failed_at = time.monotonic()
+        await session.close()
+        return SessionLocal()
+    return session
+
+
+async def get_read_db():
+    # for handlers that never write: no COMMIT is sent, the transaction is
+    # rolled back when the connection returns to the pool
+    session = await open_read_session()
+    try:
+        if DB_READ_ONLY_TRANSACTIONS and not is_sqlite:
+            await session.execute(text("SET TRANSACTION READ ONLY"))
+        yield session
+    finally:
+        await session.close()
+
+
 @asynccontextmanager
 async def get_session():
     async with SessionLocal() as session:
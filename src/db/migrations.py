@@ -0,0 +1,262 @@
+import asyncio
+from typing import Iterable
+
+from sqlalchemy import (
+    Table,
+    bindparam,
+    case,
+    func,
+    insert,
+    inspect,
+    select,
+    text,
+    update,
+)
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+from src.db.db_models import (
+    CategoryHistory,
+    DiceRoll,
+    HltbGame,
+    IgdbGame,
+    Notification,
+    PlayerCard,
+    PlayerGame,
+    PlayerMove,
+    SchemaMigration,
+    ViewerSamples,
+)
+from src.db.db_session import engine
+from src.utils.game_names import game_key
+
+BACKFILL_BATCH_SIZE = 1000
+
+# (table, title column, index) of every table carrying a game_key
+GAME_KEY_TABLES = (
+    (IgdbGame.__table__, "name", "ix_igdb_games_game_key"),
+    (HltbGame.__table__, "game_name", "ix_hltb_games_game_key"),
+    (PlayerGame.__table__, "item_title", "ix_player_games_game_key"),
+    (
+        CategoryHistory.__table__,
+        "category_name",
+        "ix_categories_history_player_key_date",
+    ),
+)
+
+HOT_PREDICATE_INDEXES = (
+    (PlayerCard.__table__, "ix_player_cards_player_id_status_card_type"),
+    (DiceRoll.__table__, "ix_dice_rolls_player_id_used_created_at"),
+    (Notification.__table__, "ix_notifications_player_id_is_read_created_at"),
+    (PlayerGame.__table__, "ix_player_games_sector_id_type"),
+    (PlayerMove.__table__, "ix_player_moves_player_id_move_type_id"),
+)
+
+# the SQL side of is_pc_platform()
+HLTB_IS_PC = case((func.lower(HltbGame.profile_platform).like("%pc%"), 1), else_=0)
+
+# indexes widened since, keyed by table name
+SUPERSEDED_INDEXES = {
+    "categories_history": ("ix_categories_history_player_id_game_key",),
+}
+
+
+async def add_missing_columns(
+    conn: AsyncConnection, table: Table, names: Iterable[str]
+) -> list[str]:
+    existing = await conn.run_sync(
+        lambda sync_conn: {
+            column["name"] for column in inspect(sync_conn).get_columns(table.name)
+        }
+    )
+    missing = [name for name in names if name not in existing]
+    for name in missing:
+        column = table.c[name]
+        column_ddl = f"{name} {column.type.compile(dialect=conn.dialect)}"
+        # non-null columns added after the fact are integers backfilled below
+        if not column.nullable:
+            column_ddl += " NOT NULL DEFAULT 0"
+        await conn.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {column_ddl}"))
+    return missing
+
+
+async def drop_superseded_indexes(conn: AsyncConnection, table: Table):
+    existing = await conn.run_sync(
+        lambda sync_conn: {
+            index["name"] for index in inspect(sync_conn).get_indexes(table.name)
+        }
+    )
+    for name in SUPERSEDED_INDEXES.get(table.name, ()):
+        if name in existing:
+            on_table = f" ON {table.name}" if conn.dialect.name == "mysql" else ""
+            await conn.execute(text(f"DROP INDEX {name}{on_table}"))
+
+
+async def create_missing_indexes(
+    conn: AsyncConnection, table: Table, names: Iterable[str]
+):
+    # only the named ones: the model also declares indexes on columns that
+    # later migrations add
+    indexes = {index.name: index for index in table.indexes}
+    for name in names:
+        await conn.run_sync(
+            lambda sync_conn: indexes[name].create(sync_conn, checkfirst=True)
+        )
+
+
+async def migrate_hltb_derived_columns(conn: AsyncConnection):
+    missing = await add_missing_columns(
+        conn, HltbGame.__table__, ("effective_length", "is_pc")
+    )
+    if missing:
+        await backfill_hltb_derived_columns(conn, missing)
+    await create_missing_indexes(
+        conn, HltbGame.__table__, ("ix_hltb_games_type_pc_length",)
+    )
+
+
+async def backfill_hltb_derived_columns(conn: AsyncConnection, missing: list[str]):
+
+    effective_length = case(
+        (HltbGame.comp_main > 0, HltbGame.comp_main),
+        (HltbGame.comp_plus > 0, HltbGame.comp_plus),
+        (HltbGame.comp_100 > 0, HltbGame.comp_100),
+        else_=HltbGame.comp_all,
+    )
+    result = await conn.execute(
+        update(HltbGame).values(
+            effective_length=effective_length,
+            is_pc=HLTB_IS_PC,
+        )
+    )
+    print(f"Backfilled {missing} for {result.rowcount} HLTB games")
+
+
+async def backfill_game_keys(conn: AsyncConnection, table: Table, title_column: str):
+    # keys are computed in Python, so rows are walked in primary key batches
+    primary_key = next(iter(table.primary_key))
+    update_query = (
+        update(table)
+        .where(primary_key == bindparam("b_id"))
+        .values(game_key=bindparam("b_game_key"))
+    )
+
+    last_id, updated = None, 0
+    while True:
+        query = (
+            select(primary_key, table.c[title_column])
+            .where(table.c.game_key.is_(None))
+            .order_by(primary_key)
+            .limit(BACKFILL_BATCH_SIZE)
+        )
+        if last_id is not None:
+            query = query.where(primary_key > last_id)
+        rows = (await conn.execute(query)).all()
+        if not rows:
+            break
+
+        await conn.execute(
+            update_query,
+            [{"b_id": row_id, "b_game_key": game_key(title)} for row_id, title in rows],
+        )
+        last_id = rows[-1][0]
+        updated += len(rows)
+
+    if updated:
+        print(f"Backfilled game_key for {updated} rows of {table.name}")
+
+
+async def migrate_game_keys(conn: AsyncConnection):
+    for table, title_column, index_name in GAME_KEY_TABLES:
+        await add_missing_columns(conn, table, ("game_key",))
+        await backfill_game_keys(conn, table, title_column)
+        await drop_superseded_indexes(conn, table)
+        await create_missing_indexes(conn, table, (index_name,))
+
+
+async def add_hot_predicate_indexes(conn: AsyncConnection):
+    # composite rather than partial: MySQL has no partial indexes, so the
+    # filtered flag is an equality column ahead of the sort column
+    for table, index_name in HOT_PREDICATE_INDEXES:
+        await create_missing_indexes(conn, table, (index_name,))
+
+
+async def recompute_hltb_is_pc(conn: AsyncConnection):
+    # rows inserted before is_pc_platform() ignored case disagree with the
+    # backfill on spellings like "pc"
+    result = await conn.execute(
+        update(HltbGame).where(HltbGame.is_pc != HLTB_IS_PC).values(is_pc=HLTB_IS_PC)
+    )
+    print(f"Recomputed is_pc for {result.rowcount} HLTB games")
+
+
+async def add_hltb_updated_at_index(conn: AsyncConnection):
+    await create_missing_indexes(
+        conn, HltbGame.__table__, ("ix_hltb_games_updated_at",)
+    )
+
+
+async def add_igdb_updated_at(conn: AsyncConnection):
+    # existing rows start at 0; the next import or edit stamps them
+    await add_missing_columns(conn, IgdbGame.__table__, ("updated_at",))
+    await create_missing_indexes(
+        conn, IgdbGame.__table__, ("ix_igdb_games_updated_at",)
+    )
+
+
+async def widen_viewer_sample_deltas(conn: AsyncConnection):
+    # tables created before deltas had a length are BLOB on MySQL; sqlite has
+    # a single unbounded BLOB type
+    if conn.dialect.name != "mysql":
+        return
+    table = ViewerSamples.__table__
+    columns = await conn.run_sync(
+        lambda sync_conn: {
+            column["name"]: column
+            for column in inspect(sync_conn).get_columns(table.name)
+        }
+    )
+    if columns["deltas"]["type"].compile(dialect=conn.dialect) == "BLOB":
+        column_ddl = table.c.deltas.type.compile(dialect=conn.dialect)
+        await conn.execute(
+            text(f"ALTER TABLE {table.name} MODIFY deltas {column_ddl} NOT NULL")
+        )
+
+
+# (version, migration), applied in order; versions are never reused or
+# reordered. Each migration also checks the schema before changing it, since
+# MySQL commits DDL immediately and a failed run can leave part of one applied
+MIGRATIONS = (
+    (1, migrate_hltb_derived_columns),
+    (2, migrate_game_keys),
+    (3, add_hot_predicate_indexes),
+    (4, recompute_hltb_is_pc),
+    (5, add_hltb_updated_at_index),
+    (6, add_igdb_updated_at),
+    (7, widen_viewer_sample_deltas),
+)
+
+
+async def migrate():
+    # create_all only creates missing tables; columns and indexes added to
+    # existing tables are created here and their rows backfilled
+    async with engine.begin() as conn:
+        await conn.run_sync(
+            lambda sync_conn: SchemaMigration.__table__.create(
+                sync_conn, checkfirst=True
+            )
+        )
+        applied = set(await conn.scalars(select(SchemaMigration.version)))
+
+    for version, migration in MIGRATIONS:
+        if version in applied:
+            continue
+        async with engine.begin() as conn:
+            await migration(conn)
+            await conn.execute(
+                insert(SchemaMigration).values(version=version, name=migration.__name__)
+            )
+        print(f"Applied migration {version}: {migration.__name__}")
+
+
+if __name__ == "__main__":
+    asyncio.run(migrate())
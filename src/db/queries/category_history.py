@@ -1,20 +1,23 @@
-import re
 from typing import Any, Dict, Optional, cast
 
-from sqlalchemy import delete, desc, func, select, text
+from sqlalchemy import and_, delete, desc, func, insert, or_, select, text
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.config import SAVE_STREAM_CATEGORIES
 from src.db.db_models import CategoryHistory
 from src.utils.db import utc_now_ts
+from src.utils.game_names import game_key
+
+# only the latest "just chatting" record per player is kept; these are game keys
+CHATTING_CATEGORIES = {"just chatting", "говорим и смотрим"}
 
 
 async def delete_old_category_records(
-    db: AsyncSession, player_id: int, category_name: str
+    db: AsyncSession, player_id: int, category_key: str
 ) -> None:
     query = delete(CategoryHistory).where(
         CategoryHistory.player_id == player_id,
-        CategoryHistory.category_name == category_name,
+        CategoryHistory.game_key == category_key,
     )
 
     await db.execute(query)
@@ -26,28 +29,77 @@ async def save_category_history(
     if not SAVE_STREAM_CATEGORIES:
         return
 
-    if category_name.lower() in ["just chatting", "говорим и смотрим"]:
-        await delete_old_category_records(db, player_id, category_name)
+    category_key = game_key(category_name)
+    if category_key in CHATTING_CATEGORIES:
+        await delete_old_category_records(db, player_id, category_key)
 
     category_history = CategoryHistory(
-        category_name=category_name, player_id=player_id, category_date=utc_now_ts()
+        category_name=category_name,
+        game_key=category_key,
+        player_id=player_id,
+        category_date=utc_now_ts(),
     )
 
     db.add(category_history)
 
 
+async def save_category_history_batch(
+    db: AsyncSession, categories: list[tuple[int, str]]
+) -> None:
+    if not SAVE_STREAM_CATEGORIES or not categories:
+        return
+
+    category_keys = [game_key(category_name) for _, category_name in categories]
+    chatting_categories = [
+        (player_id, category_key)
+        for (player_id, _), category_key in zip(categories, category_keys)
+        if category_key in CHATTING_CATEGORIES
+    ]
+    if chatting_categories:
+        await db.execute(
+            delete(CategoryHistory).where(
+                or_(
+                    *[
+                        and_(
+                            CategoryHistory.player_id == player_id,
+                            CategoryHistory.game_key == category_key,
+                        )
+                        for player_id, category_key in chatting_categories
+                    ]
+                )
+            )
+        )
+
+    category_date = utc_now_ts()
+    await db.execute(
+        insert(CategoryHistory),
+        [
+            {
+                "player_id": player_id,
+                "category_name": category_name,
+                "game_key": category_key,
+                "category_date": category_date,
+            }
+            for (player_id, category_name), category_key in zip(
+                categories, category_keys
+            )
+        ],
+    )
+
+
 async def find_category_by_prefix(
     db: AsyncSession, player_id: int, prefix: str, limit: int = 1
 ) -> Optional[str]:
-    query = (
-        select(CategoryHistory.category_name)
-        .where(
-            CategoryHistory.player_id == player_id,
-            CategoryHistory.category_name.ilike(f"{prefix}%"),
-        )
-        .order_by(desc(CategoryHistory.category_date))
-        .limit(limit)
+    # a range on the key is a seek on (player_id, game_key, ...) in every
+    # backend, where ILIKE on the name scans all of the player's rows
+    start = game_key(prefix)
+    query = select(CategoryHistory.category_name).where(
+        CategoryHistory.player_id == player_id, CategoryHistory.game_key >= start
     )
+    if start:
+        end = start[:-1] + chr(ord(start[-1]) + 1)
+        query = query.where(CategoryHistory.game_key < end)
+    query = query.order_by(desc(CategoryHistory.category_date)).limit(limit)
 
     result = await db.execute(query)
     return result.scalars().first()
@@ -56,26 +108,26 @@ async def find_category_by_prefix(
 async def calculate_time_by_category_name(
     db: AsyncSession, category_name: str, player_id: int
 ) -> Dict[str, Any]:
-    clean_category_name = re.sub(r"\(.*?\)", "", category_name.strip())
-
+    # records are linked by game key, so "ELDEN RING" and "Elden Ring" count
+    # as one game; the window only spans this player's rows
     query = text("""
         WITH time_differences AS (
             SELECT
-                category_name,
-                player_id,
+                game_key,
                 category_date,
-                LEAD(category_name) OVER (PARTITION BY player_id ORDER BY id) AS next_category_name,
-                LEAD(category_date) OVER (PARTITION BY player_id ORDER BY id) AS next_category_date
+                LEAD(game_key) OVER (ORDER BY id) AS next_game_key,
+                LEAD(category_date) OVER (ORDER BY id) AS next_category_date
             FROM
                 categories_history
+            WHERE
+                player_id = :player_id
         )
         SELECT
-            category_name,
             SUM(
                 CASE
-                    WHEN next_category_name IS NULL THEN
+                    WHEN next_game_key IS NULL THEN
                         (:current_time - category_date)
-                    WHEN next_category_name != category_name THEN
+                    WHEN next_game_key != game_key THEN
                         (next_category_date - category_date)
                     ELSE
                         0
@@ -84,16 +136,13 @@ async def calculate_time_by_category_name(
         FROM
             time_differences
         WHERE
-            category_name = :category_name AND
-            player_id = :player_id
-        GROUP BY
-            category_name;
+            game_key = :game_key;
     """)
 
     result = await db.execute(
         query,
         {
-            "category_name": clean_category_name,
+            "game_key": game_key(category_name),
             "player_id": player_id,
             "current_time": utc_now_ts(),
         },
@@ -141,9 +190,14 @@ async def get_current_game_duration(
 async def calculate_game_duration_by_title(
     db: AsyncSession, game_title: str, player_id: int
 ) -> int:
-    clean_game_title = re.sub(r"\s*\(\d{4}\)", "", game_title).strip()
-
-    found_category = await find_category_by_prefix(db, player_id, clean_game_title)
+    result = await calculate_time_by_category_name(db, game_title, player_id)
+    total_seconds = int(result.get("total_difference_in_seconds", 0) or 0)
+    if total_seconds > 0:
+        return total_seconds
+
+    # nothing streamed under this exact game, e.g. it was streamed as
+    # "Title: Subtitle"; fall back to the latest category starting with it
+    found_category = await find_category_by_prefix(db, player_id, game_title)
 
     if not found_category:
         return 0
@@ -0,0 +1,64 @@
+from collections import Counter
+
+from sqlalchemy import event, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from src.db.db_models import PlayerGame
+from src.utils.game_names import game_key
+
+# keys of every game a player has finished, dropped or rerolled, counted
+# so that editing one of two games with the same title keeps the other
+completed_titles_by_player: dict[int, Counter[str]] = {}
+
+PENDING_TITLES_KEY = "pending_completed_titles"
+
+
+async def load_completed_titles(db: AsyncSession, player_ids: list[int]) -> None:
+    query = await db.execute(
+        select(PlayerGame.player_id, PlayerGame.item_title, PlayerGame.game_key).where(
+            PlayerGame.player_id.in_(player_ids)
+        )
+    )
+
+    titles: dict[int, Counter[str]] = {player_id: Counter() for player_id in player_ids}
+    for player_id, item_title, item_key in query.all():
+        titles[player_id][item_key or game_key(item_title)] += 1
+
+    completed_titles_by_player.clear()
+    completed_titles_by_player.update(titles)
+
+
+def has_completed_title(player_id: int, game_name: str) -> bool:
+    titles = completed_titles_by_player.get(player_id)
+    if titles is None:
+        return False
+    return titles[game_key(game_name)] > 0
+
+
+def track_completed_title_change(
+    db: AsyncSession,
+    player_id: int,
+    new_title: str | None,
+    old_title: str | None = None,
+) -> None:
+    # applied to the cache only once the session commits
+    pending = db.sync_session.info.setdefault(PENDING_TITLES_KEY, [])
+    pending.append((player_id, new_title, old_title))
+
+
+@event.listens_for(Session, "after_commit")
+def _apply_pending_titles(session: Session) -> None:
+    for player_id, new_title, old_title in session.info.pop(PENDING_TITLES_KEY, []):
+        titles = completed_titles_by_player.get(player_id)
+        if titles is None:
+            continue
+        if old_title is not None:
+            titles[game_key(old_title)] -= 1
+        if new_title is not None:
+            titles[game_key(new_title)] += 1
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_pending_titles(session: Session) -> None:
+    session.info.pop(PENDING_TITLES_KEY, None)
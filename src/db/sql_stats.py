@@ -0,0 +1,66 @@
+import re
+import time
+from collections import Counter
+from contextvars import ContextVar
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# "IN (?, ?, ?)" and multi-row VALUES vary with the number of items, not the
+# shape of the query
+PLACEHOLDER_LIST = re.compile(r"(?:\?|%s|:\w+)(?:\s*,\s*(?:\?|%s|:\w+))+")
+ROW_LIST = re.compile(r"(\([^()]*\))(?:\s*,\s*\([^()]*\))+")
+WHITESPACE = re.compile(r"\s+")
+
+# set on the execution context, which a failed statement simply drops
+STARTED_ATTRIBUTE = "_sql_stats_started"
+
+
+def statement_shape(statement: str) -> str:
+    shape = PLACEHOLDER_LIST.sub("?, ...", statement)
+    shape = ROW_LIST.sub(r"\1, ...", shape)
+    return WHITESPACE.sub(" ", shape).strip()
+
+
+class SqlStats:
+    # statements run on behalf of one request
+    def __init__(self):
+        self.statements = 0
+        self.seconds = 0.0
+        self.shapes: Counter[str] = Counter()
+        # (statement, seconds) in order, kept only while a request is
+        # profiled; parameters are left out since they can hold secrets
+        self.statement_log: list[tuple[str, float]] | None = None
+
+    def add(self, statement: str, seconds: float):
+        self.statements += 1
+        self.seconds += seconds
+        self.shapes[statement_shape(statement)] += 1
+        if self.statement_log is not None:
+            self.statement_log.append((statement, seconds))
+
+    def most_repeated(self) -> tuple[str, int]:
+        if not self.shapes:
+            return "", 0
+        return self.shapes.most_common(1)[0]
+
+
+current_sql_stats: ContextVar[SqlStats | None] = ContextVar(
+    "current_sql_stats", default=None
+)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, many):
+    setattr(context, STARTED_ATTRIBUTE, time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, many):
+    started = getattr(context, STARTED_ATTRIBUTE)
+    stats = current_sql_stats.get()
+    if stats is not None:
+        stats.add(statement, time.perf_counter() - started)
+
+
+def instrument_engine(engine: Engine):
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
@@ -0,0 +1,34 @@
+from typing import Iterable
+
+from sqlalchemy import Table
+from sqlalchemy.dialects import mysql, postgresql, sqlite
+
+
+def upsert_statement(
+    dialect_name: str,
+    table: Table,
+    conflict_columns: list[str],
+    insert_only: Iterable[str] = (),
+):
+    # an executemany-able INSERT that overwrites the row holding the same
+    # conflict_columns instead of failing; insert_only columns keep the
+    # value of the first insert
+    kept = {*conflict_columns, *insert_only}
+    updated = [
+        column.name
+        for column in table.columns
+        if not column.primary_key and column.name not in kept
+    ]
+    if dialect_name == "mysql":
+        # MySQL picks the conflicting unique key itself
+        statement = mysql.insert(table)
+        return statement.on_duplicate_key_update(
+            {name: statement.inserted[name] for name in updated}
+        )
+
+    dialect_insert = {"postgresql": postgresql.insert, "sqlite": sqlite.insert}
+    statement = dialect_insert[dialect_name](table)
+    return statement.on_conflict_do_update(
+        index_elements=conflict_columns,
+        set_={name: statement.excluded[name] for name in updated},
+    )
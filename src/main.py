@@ -1,6 +1,4 @@
-import logging
-
-from fastapi import FastAPI, Request, Response
+from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
 from src.api import (
@@ -11,54 +9,29 @@ from src.api import (
     hltb,
     igdb,
     internal,
+    metrics,
     notifications,
     players,
     rules,
     stats,
     taxes,
 )
-from src.config import setup_logging
+from src.utils.compression import CompressionMiddleware
+from src.utils.metrics import MetricsMiddleware
+from src.utils.profiling import PROFILE_ID_HEADER, ProfilingMiddleware
+from src.utils.request_logging import REQUEST_ID_HEADER, RequestLoggingMiddleware
+from src.utils.request_sql_stats import SQL_STATS_HEADERS, SqlStatsMiddleware
+from src.utils.structured_logging import setup_logging
 
 setup_logging()
-logger = logging.getLogger(__name__)
-
-
-async def logging_middleware(request: Request, call_next):
-    try:
-        response = await call_next(request)
-
-        if response.status_code >= 400:
-            logger.error(
-                f"Failed request: {request.method} {request.url} - Status: {response.status_code}"
-            )
-
-            response_body = b""
-            async for chunk in response.body_iterator:
-                response_body += chunk
-
-            try:
-                body_text = response_body.decode()
-                if body_text:
-                    logger.error(f"Error response body: {body_text}")
-            except Exception as e:
-                logger.error(f"Could not decode response body: {e}")
-
-            return Response(
-                content=response_body,
-                status_code=response.status_code,
-                headers=dict(response.headers),
-                media_type=response.media_type,
-            )
-
-        return response
-    except Exception as e:
-        logger.error(f"Middleware error: {e}")
-        raise
-
 
 app = FastAPI()
 
-app.middleware("http")(logging_middleware)
+# inside the SQL stats, whose statements it logs for a profiled request
+app.add_middleware(ProfilingMiddleware)
+app.add_middleware(SqlStatsMiddleware)
+# outside the SQL stats so their log lines carry the request id
+app.add_middleware(RequestLoggingMiddleware)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=[
@@ -69,7 +42,12 @@ app.add_middleware(
     allow_credentials=False,
     allow_methods=["*"],
     allow_headers=["*"],  # Adjust as needed for production
+    expose_headers=[*SQL_STATS_HEADERS, REQUEST_ID_HEADER, PROFILE_ID_HEADER],
 )
+# outside the request log, which keeps logging the uncompressed body
+app.add_middleware(CompressionMiddleware)
+# outermost, so the histogram covers the other middlewares too
+app.add_middleware(MetricsMiddleware)
 
 app.include_router(auth.router)
 app.include_router(players.router)
@@ -83,3 +61,4 @@ app.include_router(event_settings.router)
 app.include_router(internal.router)
 app.include_router(notifications.router)
 app.include_router(stats.router)
+app.include_router(metrics.router)
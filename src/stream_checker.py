@@ -1,21 +1,27 @@
 import logging
 import os
 import re
-from typing import Any, Dict
+import time
+from typing import Any, Dict, Iterable
 
 import cloudscraper
 import requests
 import ua_generator
-from lxml import html
-from sqlalchemy import select
+from lxml import etree
+from pydantic import BaseModel
+from sqlalchemy import bindparam, select, update
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from src.db.db_models import IgdbGame, PlayerGame, User
-from src.db.queries.category_history import save_category_history
+from src.config import KICK_API_URL, TWITCH_API_URL
+from src.db.db_models import User
+from src.db.queries.category_history import save_category_history_batch
+from src.db.queries.player_games import has_completed_title, load_completed_titles
+from src.db.queries.viewer_samples import record_viewer_samples
 from src.enums import StreamPlatform
 from src.utils.db import safe_commit, utc_now_ts
+from src.utils.igdb_index import resolve_game_cover
+from src.utils.metrics import STREAM_CHECK_SECONDS
 
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 twitch_headers = {
@@ -34,43 +40,9 @@ kick_headers = {
 }
 
 
-def _clean_game_name(game_name: str) -> str:
-    return re.sub(r"\s*\(\d{4}\)$", "", game_name).strip()
-
-
-async def _player_has_completed_game(
-    db: AsyncSession, player_id: int, game_name: str
-) -> bool:
-    clean_name = _clean_game_name(game_name)
-    query = await db.execute(
-        select(PlayerGame).where(PlayerGame.player_id == player_id)
-    )
-    games = query.scalars().all()
-    for g in games:
-        if _clean_game_name(g.item_title) == clean_name:
-            return True
-    return False
-
-
-async def _get_game_cover(db: AsyncSession, game_name: str) -> str | None:
-    from sqlalchemy import case
-
-    query = await db.execute(
-        select(IgdbGame.cover)
-        .where(IgdbGame.name.ilike(f"{game_name}%"))
-        .order_by(
-            case((IgdbGame.name.ilike(f"{game_name}%"), 0), else_=1), IgdbGame.name
-        )
-        .limit(1)
-    )
-
-    result = query.scalar_one_or_none()
-    return result
-
-
 def _get_twitch_user_avatar(username: str) -> str | None:
     try:
-        url = f"https://api.twitch.tv/helix/users?login={username}"
+        url = f"{TWITCH_API_URL}/users?login={username}"
         response = requests.get(url, headers=twitch_headers, timeout=15)
         response.raise_for_status()
 
@@ -78,47 +50,221 @@ def _get_twitch_user_avatar(username: str) -> str | None:
         if len(data) > 0:
             return data[0]["profile_image_url"]
     except Exception as e:
-        logger.error(f"Error getting Twitch avatar for {username}: {str(e)}")
+        logger.error(
+            "Error getting Twitch avatar for %s: %s",
+            username,
+            e,
+            extra={"sample_key": f"twitch-avatar {username}"},
+        )
 
     return None
 
 
-def _get_vk_user_avatar(stream_link: str) -> str | None:
-    try:
-        response = requests.get(stream_link, timeout=15)
-        response.raise_for_status()
+class VkPageData(BaseModel):
+    avatar_url: str | None = None
+    category: str | None = None
+    online_count: str | None = None
+    is_live: bool = False
 
-        content = html.fromstring(response.content)
 
-        avatar_xpath = content.xpath(
-            "/html/body/div[1]/div/div[2]/div[2]/div/div[3]/div[1]/div[1]/div/div[1]/div[1]/div[1]/div/img/@src"
-        )
+class VkPageCacheEntry(BaseModel):
+    etag: str | None = None
+    last_modified: str | None = None
+    page: VkPageData
 
-        if len(avatar_xpath) > 0:
-            avatar_url = avatar_xpath[0]
-            if avatar_url.startswith("//"):
-                avatar_url = "https:" + avatar_url
-            elif avatar_url.startswith("/"):
-                avatar_url = "https://vkplay.live" + avatar_url
-            return avatar_url
-    except Exception as e:
-        logger.error(f"Error getting VK avatar from {stream_link}: {str(e)}")
 
-    return None
+VK_CHANNEL_XPATH = "/html/body/div[1]/div/div[2]/div[2]/div/div[3]/div[1]/div[1]/div"
+VK_AVATAR_XPATH = VK_CHANNEL_XPATH + "/div[1]/div[1]/div[1]/div/img"
+VK_CATEGORY_XPATH = VK_CHANNEL_XPATH + "/div[2]/div[1]/div/a"
+VK_ONLINE_COUNT_XPATH = VK_CHANNEL_XPATH + "/div[1]/div[2]/div[2]/div[2]/div[2]/div"
+VK_STREAM_STATUS_MARKER = b"StreamStatus_text"
+VK_CHUNK_SIZE = 16 * 1024
+
+vk_page_cache: dict[str, VkPageCacheEntry] = {}
+
+
+def _parse_xpath_steps(xpath: str) -> list[tuple[str, int | None]]:
+    steps = []
+    for step in xpath.strip("/").split("/"):
+        match = re.fullmatch(r"(\w+)(?:\[(\d+)\])?", step)
+        if match is None:
+            raise ValueError(f"Unsupported xpath step: {step}")
+        index = match.group(2)
+        steps.append((match.group(1), int(index) if index else None))
+    return steps
+
+
+class _VkPageTarget:
+    # lxml parser target that tracks the absolute element path and picks out
+    # the avatar, category and online count elements without building a tree
+    paths = {
+        "avatar_url": _parse_xpath_steps(VK_AVATAR_XPATH),
+        "category": _parse_xpath_steps(VK_CATEGORY_XPATH),
+        "online_count": _parse_xpath_steps(VK_ONLINE_COUNT_XPATH),
+    }
+
+    def __init__(self):
+        self.path: list[tuple[str, int]] = []
+        self.child_counts: list[dict[str, int]] = [{}]
+        self.found: dict[str, str | None] = {}
+        self.capturing: str | None = None
+        self.captured_text: list[str] = []
+
+    def _matches(self, steps: list[tuple[str, int | None]]) -> bool:
+        if len(steps) != len(self.path):
+            return False
+        for (tag, index), (path_tag, path_index) in zip(steps, self.path):
+            if tag != path_tag or (index is not None and index != path_index):
+                return False
+        return True
+
+    def _stop_capture(self):
+        if self.capturing is not None:
+            self.found[self.capturing] = "".join(self.captured_text)
+            self.capturing = None
+            self.captured_text = []
+
+    def start(self, tag, attrib):
+        # element .text ends at the first child element
+        self._stop_capture()
+
+        counts = self.child_counts[-1]
+        counts[tag] = counts.get(tag, 0) + 1
+        self.path.append((tag, counts[tag]))
+        self.child_counts.append({})
+
+        for field, steps in self.paths.items():
+            if field in self.found or not self._matches(steps):
+                continue
+            if field == "avatar_url":
+                self.found[field] = attrib.get("src")
+            else:
+                self.capturing = field
+
+    def end(self, tag):
+        self._stop_capture()
+        if self.path:
+            self.path.pop()
+            self.child_counts.pop()
+
+    def data(self, data):
+        if self.capturing is not None:
+            self.captured_text.append(data)
+
+    def close(self):
+        self._stop_capture()
+
+    @property
+    def done(self) -> bool:
+        return len(self.found) == len(self.paths)
+
+
+def _absolute_vk_url(url: str) -> str:
+    if url.startswith("//"):
+        return "https:" + url
+    if url.startswith("/"):
+        return "https://vkplay.live" + url
+    return url
+
+
+def _parse_vk_page(chunks: Iterable[bytes]) -> VkPageData:
+    target = _VkPageTarget()
+    parser = etree.HTMLParser(target=target)
+    status_found = False
+    tail = b""
+
+    for chunk in chunks:
+        if not status_found:
+            window = tail + chunk
+            status_found = VK_STREAM_STATUS_MARKER in window
+            tail = window[-len(VK_STREAM_STATUS_MARKER) :]
+        parser.feed(chunk)
+        if status_found and target.done:
+            break
+    parser.close()
+
+    avatar_url = target.found.get("avatar_url")
+    category = target.found.get("category")
+    return VkPageData(
+        avatar_url=_absolute_vk_url(avatar_url) if avatar_url else None,
+        category=category,
+        online_count=target.found.get("online_count"),
+        is_live=category is not None and status_found,
+    )
+
+
+def _get_vk_page_data(stream_link: str) -> VkPageData:
+    cached = vk_page_cache.get(stream_link)
+    headers = {}
+    if cached is not None:
+        if cached.etag:
+            headers["If-None-Match"] = cached.etag
+        if cached.last_modified:
+            headers["If-Modified-Since"] = cached.last_modified
+
+    with requests.get(
+        stream_link, headers=headers, timeout=110, stream=True
+    ) as response:
+        if response.status_code == 304 and cached is not None:
+            return cached.page
+
+        response.raise_for_status()
+        page = _parse_vk_page(response.iter_content(chunk_size=VK_CHUNK_SIZE))
+
+        etag = response.headers.get("ETag")
+        last_modified = response.headers.get("Last-Modified")
+        if etag or last_modified:
+            vk_page_cache[stream_link] = VkPageCacheEntry(
+                etag=etag, last_modified=last_modified, page=page
+            )
+        else:
+            vk_page_cache.pop(stream_link, None)
+
+    return page
 
 
 def _get_kick_channel_data(username: str) -> dict | None:
     try:
-        url = f"https://kick.com/api/v1/channels/{username}"
+        url = f"{KICK_API_URL}/channels/{username}"
         response = kick_session.get(url, headers=kick_headers, timeout=15)
         response.raise_for_status()
         return response.json()
     except Exception as e:
-        logger.error(f"Error getting Kick data for {username}: {str(e)}")
+        logger.error(
+            "Error getting Kick data for %s: %s",
+            username,
+            e,
+            extra={"sample_key": f"kick {username}"},
+        )
 
     return None
 
 
+class StreamObservation(BaseModel):
+    is_online: bool
+    game_name: str | None = None
+    viewer_count: int = 0
+    avatar_url: str | None = None
+
+
+# every user update carries the full set so all of them fit one executemany
+STREAM_COLUMNS = (
+    "is_online",
+    "online_count",
+    "current_game",
+    "current_game_cover",
+    "current_game_updated_at",
+    "avatar_link",
+)
+
+users_table = User.__table__
+update_stream_columns_query = (
+    update(users_table)
+    .where(users_table.c.id == bindparam("b_id"))
+    .values({column: bindparam(f"b_{column}") for column in STREAM_COLUMNS})
+)
+
+
 async def refresh_stream_statuses(db: AsyncSession) -> Dict[str, Any]:
     stats: Dict[str, Any] = {
         "total_players": 0,
@@ -126,6 +272,7 @@ async def refresh_stream_statuses(db: AsyncSession) -> Dict[str, Any]:
         "online_players": 0,
         "errors": [],
     }
+    start = time.perf_counter()
 
     try:
         query = await db.execute(
@@ -137,19 +284,44 @@ async def refresh_stream_statuses(db: AsyncSession) -> Dict[str, Any]:
         players = query.scalars().all()
         stats["total_players"] = len(players)
 
+        await load_completed_titles(db, [player.id for player in players])
+
+        user_updates: list[dict[str, Any]] = []
+        categories: list[tuple[int, str]] = []
+        viewer_samples: list[tuple[int, int]] = []
+
         for player in players:
+            is_online = player.is_online
             try:
-                updated = await _check_single_player_stream(player, db)
-                if updated:
-                    stats["updated_players"] += 1
-                if player.is_online:
+                observation = _check_single_player_stream(player)
+                if observation is not None:
+                    changes, category = await _diff_player_stream(
+                        db, player, observation
+                    )
+                    if changes:
+                        user_updates.append(_user_update_row(player, changes))
+                        is_online = changes.get("is_online", is_online)
+                    if category is not None:
+                        categories.append((player.id, category))
+                    if changes or category is not None:
+                        stats["updated_players"] += 1
+                    if is_online or player.is_online:
+                        viewers = changes.get("online_count", player.online_count)
+                        viewer_samples.append((player.id, viewers if is_online else 0))
+                if is_online:
                     stats["online_players"] += 1
 
             except Exception as e:
                 error_msg = f"Error checking stream for {player.username}: {str(e)}"
-                logger.error(error_msg)
+                logger.error(
+                    error_msg, extra={"sample_key": f"stream {player.username}"}
+                )
                 stats["errors"].append(error_msg)
 
+        if user_updates:
+            await db.execute(update_stream_columns_query, user_updates)
+        await save_category_history_batch(db, categories)
+        await record_viewer_samples(db, viewer_samples, utc_now_ts())
         await safe_commit(db)
 
     except Exception as e:
@@ -157,37 +329,73 @@ async def refresh_stream_statuses(db: AsyncSession) -> Dict[str, Any]:
         logger.error(error_msg)
         stats["errors"].append(error_msg)
 
+    STREAM_CHECK_SECONDS.labels("error" if stats["errors"] else "ok").observe(
+        time.perf_counter() - start
+    )
     return stats
 
 
-async def _check_single_player_stream(player: User, db: AsyncSession) -> bool:
-    updated = False
+def _user_update_row(player: User, changes: dict[str, Any]) -> dict[str, Any]:
+    row = {"b_id": player.id}
+    for column in STREAM_COLUMNS:
+        row[f"b_{column}"] = changes.get(column, getattr(player, column))
+    return row
+
+
+async def _diff_player_stream(
+    db: AsyncSession, player: User, observation: StreamObservation
+) -> tuple[dict[str, Any], str | None]:
+    changes: dict[str, Any] = {}
+    category = None
+
+    if observation.avatar_url and observation.avatar_url != player.avatar_link:
+        changes["avatar_link"] = observation.avatar_url
+
+    if observation.is_online and observation.game_name is not None:
+        game_name = observation.game_name
+        changes["online_count"] = observation.viewer_count
+
+        if game_name != player.current_game or not player.is_online:
+            changes["is_online"] = 1
+            if not has_completed_title(player.id, game_name):
+                changes["current_game"] = game_name
+                changes["current_game_cover"] = await resolve_game_cover(db, game_name)
+                changes["current_game_updated_at"] = utc_now_ts()
+                category = game_name
+    elif player.is_online:
+        changes["is_online"] = 0
+        changes["online_count"] = 0
+        category = "Offline"
+
+    changes = {
+        column: value
+        for column, value in changes.items()
+        if value != getattr(player, column)
+    }
+    return changes, category
+
 
+def _check_single_player_stream(player: User) -> StreamObservation | None:
     if (
         player.main_platform == StreamPlatform.TWITCH.value
         and player.twitch_stream_link
     ):
-        updated = await _check_twitch_stream(player, db)
+        return _check_twitch_stream(player.username, player.twitch_stream_link)
     elif player.main_platform == StreamPlatform.VK.value and player.vk_stream_link:
-        updated = await _check_vk_stream(player, db)
+        return _check_vk_stream(player.username, player.vk_stream_link)
     elif player.main_platform == StreamPlatform.KICK.value and player.kick_stream_link:
-        updated = await _check_kick_stream(player, db)
-
-    return updated
+        return _check_kick_stream(player.username, player.kick_stream_link)
 
+    return None
 
-async def _check_twitch_stream(player: User, db: AsyncSession) -> bool:
-    if player.twitch_stream_link is None:
-        return False
 
+def _check_twitch_stream(player_name: str, stream_link: str) -> StreamObservation:
     try:
-        username = player.twitch_stream_link.rsplit("/", 1)[1]
+        username = stream_link.rsplit("/", 1)[1]
 
         avatar_url = _get_twitch_user_avatar(username)
-        if avatar_url and avatar_url != player.avatar_link:
-            player.avatar_link = avatar_url
 
-        url = f"https://api.twitch.tv/helix/streams?user_login={username}"
+        url = f"{TWITCH_API_URL}/streams?user_login={username}"
 
         response = requests.get(url, headers=twitch_headers, timeout=15)
         response.raise_for_status()
@@ -196,175 +404,87 @@ async def _check_twitch_stream(player: User, db: AsyncSession) -> bool:
 
         if len(data) != 0 and data[0]["type"] == "live":
             stream = data[0]
-            game_name = stream["game_name"].strip()
-            viewer_count = int(stream["viewer_count"])
-
-            has_completed_game = await _player_has_completed_game(
-                db, player.id, game_name
+            return StreamObservation(
+                is_online=True,
+                game_name=stream["game_name"].strip(),
+                viewer_count=int(stream["viewer_count"]),
+                avatar_url=avatar_url,
             )
 
-            if game_name != player.current_game or not player.is_online:
-                if not has_completed_game:
-                    player.is_online = 1
-                    player.online_count = viewer_count
-                    player.current_game = game_name
-                    game_cover = await _get_game_cover(db, game_name)
-                    player.current_game_cover = game_cover
-
-                    player.current_game_updated_at = utc_now_ts()
-
-                    await save_category_history(db, player.id, game_name)
-                    return True
-                else:
-                    player.is_online = 1
-                    player.online_count = viewer_count
-                    return True
-            else:
-                player.online_count = viewer_count
-                return True
-        else:
-            if player.is_online:
-                player.is_online = 0
-                player.online_count = 0
-
-                await save_category_history(db, player.id, "Offline")
-                return True
+        return StreamObservation(is_online=False, avatar_url=avatar_url)
 
     except Exception as e:
-        logger.error(f"Error checking Twitch for {player.username}: {str(e)}")
-
+        logger.error(
+            "Error checking Twitch for %s: %s",
+            player_name,
+            e,
+            extra={"sample_key": f"twitch {player_name}"},
+        )
         raise
 
-    return False
-
-
-async def _check_vk_stream(player: User, db: AsyncSession) -> bool:
-    if player.vk_stream_link is None:
-        return False
 
+def _check_vk_stream(player_name: str, stream_link: str) -> StreamObservation:
     try:
-        avatar_url = _get_vk_user_avatar(player.vk_stream_link)
-        if avatar_url and avatar_url != player.avatar_link:
-            player.avatar_link = avatar_url
-
-        response = requests.get(player.vk_stream_link, timeout=110)
-        response.raise_for_status()
-
-        content = html.fromstring(response.content)
-
-        category_xpath = content.xpath(
-            "/html/body/div[1]/div/div[2]/div[2]/div/div[3]/div[1]/div[1]/div/div[2]/div[1]/div/a"
-        )
-        online_count_xpath = content.xpath(
-            "/html/body/div[1]/div/div[2]/div[2]/div/div[3]/div[1]/div[1]/div/div[1]/div[2]/div[2]/div[2]/div[2]/div"
-        )
-
-        if len(category_xpath) != 0 and "StreamStatus_text" in response.text:
-            category = category_xpath[0].text.strip()
-            online_count = int(online_count_xpath[0].text.replace(",", ""))
-
-            has_completed_game = await _player_has_completed_game(
-                db, player.id, category
+        page = _get_vk_page_data(stream_link)
+
+        if page.is_live and page.category is not None:
+            return StreamObservation(
+                is_online=True,
+                game_name=page.category.strip(),
+                viewer_count=int((page.online_count or "").replace(",", "")),
+                avatar_url=page.avatar_url,
             )
 
-            if category != player.current_game or not player.is_online:
-                if not has_completed_game:
-                    player.is_online = 1
-                    player.online_count = online_count
-                    player.current_game = category
-                    game_cover = await _get_game_cover(db, category)
-                    player.current_game_cover = game_cover
-
-                    player.current_game_updated_at = utc_now_ts()
-
-                    await save_category_history(db, player.id, category)
-                    return True
-                else:
-                    player.is_online = 1
-                    player.online_count = online_count
-                    return True
-            else:
-                player.online_count = online_count
-                return True
-        else:
-            if player.is_online:
-                player.is_online = 0
-                player.online_count = 0
-
-                await save_category_history(db, player.id, "Offline")
-                return True
+        return StreamObservation(is_online=False, avatar_url=page.avatar_url)
 
     except Exception as e:
-        logger.error(f"Error checking VK Play for {player.username}: {str(e)}")
+        logger.error(
+            "Error checking VK Play for %s: %s",
+            player_name,
+            e,
+            extra={"sample_key": f"vk {player_name}"},
+        )
         raise
 
-    return False
-
-
-async def _check_kick_stream(player: User, db: AsyncSession) -> bool:
-    if player.kick_stream_link is None:
-        return False
 
+def _check_kick_stream(player_name: str, stream_link: str) -> StreamObservation | None:
     try:
-        username = player.kick_stream_link.rsplit("/", 1)[1]
+        username = stream_link.rsplit("/", 1)[1]
         data = _get_kick_channel_data(username)
 
         if not data:
-            return False
+            return None
 
-        is_online = "livestream" in data and data["livestream"] is not None
         avatar_url = data.get("user", {}).get("profile_pic")
 
-        if avatar_url and avatar_url != player.avatar_link:
-            player.avatar_link = avatar_url
+        livestream = data.get("livestream")
+        if livestream is None:
+            return StreamObservation(is_online=False, avatar_url=avatar_url)
 
-        if is_online:
-            livestream = data["livestream"]
-            categories = livestream.get("categories", [])
-
-            if len(categories) > 0:
-                first_category = categories[0]
-                game_name = first_category.get("name", "Unknown").strip()
-                viewer_count = int(first_category.get("viewers", 0))
-            else:
-                game_name = "Just Chatting"
-                viewer_count = 0
-
-            has_completed_game = await _player_has_completed_game(
-                db, player.id, game_name
-            )
-
-            if game_name != player.current_game or not player.is_online:
-                if not has_completed_game:
-                    if game_name == "Slots & Casino":
-                        game_name = "Just Chatting"
-                    player.is_online = 1
-                    player.online_count = viewer_count
-                    player.current_game = game_name
-                    game_cover = await _get_game_cover(db, game_name)
-                    player.current_game_cover = game_cover
-
-                    player.current_game_updated_at = utc_now_ts()
-
-                    await save_category_history(db, player.id, game_name)
-                    return True
-                else:
-                    player.is_online = 1
-                    player.online_count = viewer_count
-                    return True
-            else:
-                player.online_count = viewer_count
-                return True
+        categories = livestream.get("categories", [])
+        if len(categories) > 0:
+            first_category = categories[0]
+            game_name = first_category.get("name", "Unknown").strip()
+            viewer_count = int(first_category.get("viewers", 0))
         else:
-            if player.is_online:
-                player.is_online = 0
-                player.online_count = 0
+            game_name = "Just Chatting"
+            viewer_count = 0
+
+        if game_name == "Slots & Casino":
+            game_name = "Just Chatting"
 
-                await save_category_history(db, player.id, "Offline")
-                return True
+        return StreamObservation(
+            is_online=True,
+            game_name=game_name,
+            viewer_count=viewer_count,
+            avatar_url=avatar_url,
+        )
 
     except Exception as e:
-        logger.error(f"Error checking Kick for {player.username}: {str(e)}")
+        logger.error(
+            "Error checking Kick for %s: %s",
+            player_name,
+            e,
+            extra={"sample_key": f"kick {player_name}"},
+        )
         raise
-
-    return False
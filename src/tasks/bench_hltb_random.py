@@ -0,0 +1,156 @@
+import argparse
+import asyncio
+import random
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+from sqlalchemy import and_, func, insert, or_, select
+from sqlalchemy.ext.asyncio import (
+    async_sessionmaker,  # pyright: ignore[reportAttributeAccessIssue]
+    create_async_engine,
+)
+
+from src.db.db_models import DbBase, HltbGame
+from src.utils import hltb_index
+
+PLATFORMS = ["PC", "PC, PlayStation 5", "Nintendo Switch", "Xbox One", None]
+
+
+def make_games(count: int, seed: int) -> list[dict]:
+    rng = random.Random(seed)
+    counters = {
+        column.name: 0
+        for column in HltbGame.__table__.columns
+        if not column.nullable
+        and column.type.python_type is int
+        and column.default is None
+    }
+    games = []
+    for game_id in range(1, count + 1):
+        hours = [rng.choice([0, 0, rng.randint(1, 150)]) for _ in range(4)]
+        games.append(
+            {
+                **counters,
+                "game_id": game_id,
+                "game_name": f"Game {game_id}",
+                "game_type": rng.choice(["game", "game", "dlc"]),
+                "game_image": f"{game_id}.jpg",
+                "profile_platform": rng.choice(PLATFORMS),
+                "comp_main": hours[0] * 3600,
+                "comp_plus": hours[1] * 3600,
+                "comp_100": hours[2] * 3600,
+                "comp_all": hours[3] * 3600,
+            }
+        )
+    return games
+
+
+def order_by_random_query(min_seconds: int, max_seconds: int, limit: int):
+    # the query /api/hltb/random-game ran before the length index
+    lengths = [
+        HltbGame.comp_main,
+        HltbGame.comp_plus,
+        HltbGame.comp_100,
+        HltbGame.comp_all,
+    ]
+    conditions = []
+    for i, length in enumerate(lengths):
+        conditions.append(
+            and_(
+                *(shorter == 0 for shorter in lengths[:i]),
+                length > 0,
+                length >= min_seconds,
+                length <= max_seconds,
+            )
+        )
+    return (
+        select(HltbGame)
+        .where(
+            and_(
+                HltbGame.profile_platform.like("%PC%"),
+                HltbGame.game_type == "game",
+                or_(*conditions),
+            )
+        )
+        .order_by(func.random())
+        .limit(limit)
+    )
+
+
+def stored_length_query(min_seconds: int, max_seconds: int, limit: int):
+    # the same filter on the stored columns, a range scan of
+    # ix_hltb_games_type_pc_length
+    return (
+        select(HltbGame)
+        .where(
+            and_(
+                HltbGame.game_type == "game",
+                HltbGame.is_pc == 1,
+                HltbGame.effective_length.between(min_seconds, max_seconds),
+            )
+        )
+        .order_by(func.random())
+        .limit(limit)
+    )
+
+
+async def timed(samples: list[float], coroutine):
+    start = time.perf_counter()
+    await coroutine
+    samples.append((time.perf_counter() - start) * 1000)
+
+
+async def run(count: int, rolls: int, seed: int):
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        engine = create_async_engine(f"sqlite+aiosqlite:///{Path(tmp_dir) / 'b.db'}")
+        async with engine.begin() as conn:
+            await conn.run_sync(DbBase.metadata.create_all)
+            await conn.execute(insert(HltbGame), make_games(count, seed))
+        session_factory = async_sessionmaker(bind=engine, expire_on_commit=False)
+
+        hltb_index.hltb_index = None
+        rng = random.Random(seed)
+        scan, stored, indexed = [], [], []
+        async with session_factory() as db:
+            start = time.perf_counter()
+            index = await hltb_index.get_hltb_index(db)
+            build_ms = (time.perf_counter() - start) * 1000
+
+            for _ in range(rolls):
+                min_hours = rng.randint(1, 40)
+                max_hours = min_hours + rng.randint(1, 40)
+                query = order_by_random_query(min_hours * 3600, max_hours * 3600, 12)
+                await timed(scan, db.execute(query))
+                query = stored_length_query(min_hours * 3600, max_hours * 3600, 12)
+                await timed(stored, db.execute(query))
+
+                game_ids = index.sample(min_hours * 3600, max_hours * 3600, 12)
+                await timed(
+                    indexed,
+                    db.execute(select(HltbGame).where(HltbGame.game_id.in_(game_ids))),
+                )
+        await engine.dispose()
+
+    print(
+        f"games={count:7d} index_build={build_ms:7.1f}ms "
+        f"order_by_random p50={statistics.median(scan):7.2f}ms "
+        f"stored_columns p50={statistics.median(stored):7.2f}ms "
+        f"indexed p50={statistics.median(indexed):6.2f}ms"
+    )
+
+
+async def main(args: argparse.Namespace):
+    for count in args.games:
+        await run(count, args.rolls, args.seed)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Compare ORDER BY random() and the HLTB length index"
+    )
+    parser.add_argument("--games", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--rolls", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=1)
+    asyncio.run(main(parser.parse_args()))
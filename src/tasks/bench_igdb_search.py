@@ -0,0 +1,127 @@
+import argparse
+import asyncio
+import random
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import (
+    async_sessionmaker,  # pyright: ignore[reportAttributeAccessIssue]
+    create_async_engine,
+)
+
+from src.db.db_models import DbBase, IgdbGame
+from src.utils import igdb_index
+from src.utils.game_catalogue import (
+    build_game_catalogue,
+    igdb_index_from_catalogue,
+    open_game_catalogue,
+)
+from src.utils.igdb_search import MemoryIgdbSearch, SqlIgdbSearch
+
+WORDS = (
+    "dark souls elden ring hollow knight shadow legend dragon quest final fantasy "
+    "star wars space station city night dead island resident evil tales of the "
+    "portal half life call duty battle field mass effect witcher cyber punk metal "
+    "gear solid super mario zelda kingdom hearts persona tomb raider far cry"
+).split()
+
+QUERIES = [
+    "e",
+    "el",
+    "eld",
+    "elde",
+    "elden",
+    "elden r",
+    "elden ring",
+    "souls",
+    "of the",
+    "dragon quest",
+    "punk",
+    "zzzz",
+]
+
+
+def make_titles(count: int, seed: int) -> list[tuple[int, str, str, int]]:
+    rng = random.Random(seed)
+    titles = []
+    for game_id in range(1, count + 1):
+        name = " ".join(rng.choice(WORDS) for _ in range(rng.randint(1, 4)))
+        if rng.random() < 0.3:
+            name += f" {rng.randint(2, 7)}"
+        name = name.title()
+        titles.append((game_id, name, f"{game_id}.jpg", rng.randint(1985, 2025)))
+    return titles
+
+
+def percentile(values: list[float], fraction: float) -> float:
+    values = sorted(values)
+    return values[min(int(len(values) * fraction), len(values) - 1)]
+
+
+async def bench_backend(name: str, backend, session_factory, repeats: int):
+    latencies = []
+    async with session_factory() as db:
+        await backend.search(db, "warmup", 20)
+        for _ in range(repeats):
+            for query in QUERIES:
+                start = time.perf_counter()
+                await backend.search(db, query, 20)
+                latencies.append((time.perf_counter() - start) * 1000)
+
+    print(
+        f"{name:<8} p50={statistics.median(latencies):8.2f}ms "
+        f"p99={percentile(latencies, 0.99):8.2f}ms max={max(latencies):8.2f}ms"
+    )
+
+
+async def main(args: argparse.Namespace):
+    titles = make_titles(args.titles, args.seed)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        engine = create_async_engine(f"sqlite+aiosqlite:///{Path(tmp_dir) / 'b.db'}")
+        async with engine.begin() as conn:
+            await conn.run_sync(DbBase.metadata.create_all)
+            await conn.execute(
+                insert(IgdbGame),
+                [
+                    {"id": i, "name": n, "cover": c, "release_year": y}
+                    for i, n, c, y in titles
+                ],
+            )
+        session_factory = async_sessionmaker(bind=engine, expire_on_commit=False)
+
+        async with session_factory() as db:
+            start = time.perf_counter()
+            index = await igdb_index.get_igdb_index(db)
+            print(
+                f"index build: {time.perf_counter() - start:.2f}s for {len(index)} "
+                f"titles, {len(index.postings)} trigrams"
+            )
+
+        await bench_backend("memory", MemoryIgdbSearch(), session_factory, args.repeats)
+
+        catalogue_path = str(Path(tmp_dir) / "catalogue.bin")
+        async with session_factory() as db:
+            await build_game_catalogue(db, catalogue_path)
+        catalogue = open_game_catalogue(catalogue_path)
+        assert catalogue is not None
+        print(f"catalogue: {Path(catalogue_path).stat().st_size / 1024 / 1024:.1f} MiB")
+        igdb_index.igdb_index = igdb_index_from_catalogue(catalogue)
+        igdb_index.igdb_index_checked_at = time.monotonic()
+        await bench_backend("mapped", MemoryIgdbSearch(), session_factory, args.repeats)
+
+        await bench_backend("sql", SqlIgdbSearch(), session_factory, args.repeats)
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Compare IGDB search backends on a synthetic catalogue"
+    )
+    parser.add_argument("--titles", type=int, default=200_000)
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=1)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,142 @@
+import argparse
+import asyncio
+import logging
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+import httpx
+from sqlalchemy.ext.asyncio import (
+    async_sessionmaker,  # pyright: ignore[reportAttributeAccessIssue]
+    create_async_engine,
+)
+
+from src.api import auth
+from src.db.db_models import DbBase, User
+from src.db.db_session import get_db
+from src.main import app
+from src.utils.jwt import hash_password, verify_password
+from src.utils.rate_limit import AttemptLimiter
+
+PASSWORD = "password"
+PROBE_PATH = "/api/rules/current"
+
+
+def make_user(index: int, password_hash: str) -> User:
+    username = f"player{index}"
+    return User(
+        username=username,
+        password_hash=password_hash,
+        first_name=username,
+        url_handle=username,
+        sector_id=1,
+        total_score=0.0,
+        maps_completed=0,
+    )
+
+
+async def verify_password_inline(plain: str, hashed: str) -> bool:
+    # what login did before: bcrypt on the event loop
+    return verify_password(plain, hashed)
+
+
+def percentile(values: list[float], fraction: float) -> float:
+    values = sorted(values)
+    return values[min(int(len(values) * fraction), len(values) - 1)]
+
+
+async def probe(client: httpx.AsyncClient, stop: asyncio.Event, interval: float):
+    latencies = []
+    while not stop.is_set():
+        start = time.perf_counter()
+        response = await client.get(PROBE_PATH)
+        latencies.append((time.perf_counter() - start) * 1000)
+        assert response.status_code < 500, response.text
+        await asyncio.sleep(interval)
+    return latencies
+
+
+async def burst(client: httpx.AsyncClient, name: str, logins: int, password: str):
+    stop = asyncio.Event()
+    prober = asyncio.create_task(probe(client, stop, 0.005))
+    await asyncio.sleep(0.05)
+
+    start = time.perf_counter()
+    responses = await asyncio.gather(
+        *(
+            client.post(
+                "/api/login", json={"username": f"player{i}", "password": password}
+            )
+            for i in range(logins)
+        )
+    )
+    elapsed = time.perf_counter() - start
+    stop.set()
+    latencies = await prober
+
+    statuses: dict[int, int] = {}
+    for response in responses:
+        statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+    print(
+        f"{name:<8} burst={elapsed:6.2f}s statuses={statuses} "
+        f"probe p50={statistics.median(latencies):7.1f}ms "
+        f"p99={percentile(latencies, 0.99):7.1f}ms max={max(latencies):7.1f}ms "
+        f"n={len(latencies)}"
+    )
+
+
+def reset_limits(per_username: int, per_ip: int):
+    auth.login_attempts_by_username_ip = AttemptLimiter(per_username, 60)
+    auth.login_attempts_by_ip = AttemptLimiter(per_ip, 60)
+
+
+async def main(args: argparse.Namespace):
+    # the app logs every 401/429 of the burst
+    logging.disable(logging.ERROR)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        engine = create_async_engine(f"sqlite+aiosqlite:///{Path(tmp_dir) / 'b.db'}")
+        async with engine.begin() as conn:
+            await conn.run_sync(DbBase.metadata.create_all)
+
+        session_factory = async_sessionmaker(bind=engine, expire_on_commit=False)
+        password_hash = hash_password(PASSWORD)
+        async with session_factory() as db:
+            db.add_all(make_user(i, password_hash) for i in range(args.logins))
+            await db.commit()
+
+        async def get_bench_db():
+            async with session_factory() as session:
+                yield session
+                await session.commit()
+
+        app.dependency_overrides[get_db] = get_bench_db
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(
+            transport=transport, base_url="http://bench", timeout=None
+        ) as client:
+            # every login comes from the one test client address
+            reset_limits(args.logins, args.logins)
+            verify_password_async = auth.verify_password_async
+            auth.verify_password_async = verify_password_inline
+            await burst(client, "inline", args.logins, PASSWORD)
+
+            reset_limits(args.logins, args.logins)
+            auth.verify_password_async = verify_password_async
+            await burst(client, "pool", args.logins, PASSWORD)
+
+            # default limits: a wrong-password burst from one address is cut
+            # off before it is hashed
+            reset_limits(auth.LOGIN_ATTEMPTS_PER_USERNAME, auth.LOGIN_ATTEMPTS_PER_IP)
+            await burst(client, "limited", args.logins, "wrong")
+
+        app.dependency_overrides.clear()
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Latency of other endpoints while a burst of logins is hashed"
+    )
+    parser.add_argument("--logins", type=int, default=50)
+    asyncio.run(main(parser.parse_args()))
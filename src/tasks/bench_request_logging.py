@@ -0,0 +1,142 @@
+import argparse
+import asyncio
+import logging
+import time
+
+from fastapi import FastAPI, HTTPException, Request, Response
+from fastapi.responses import PlainTextResponse
+from starlette.middleware import Middleware
+from starlette.middleware.base import BaseHTTPMiddleware
+
+from src.main import app as main_app
+from src.utils.request_logging import RequestLoggingMiddleware
+
+LARGE_ERROR_BYTES = 1024 * 1024
+PATHS = ("/ok", "/error", "/large-error")
+
+logger = logging.getLogger(__name__)
+
+
+async def buffering_logging_middleware(request: Request, call_next):
+    # what main.py did before: call_next, then drain and rebuild error bodies
+    try:
+        response = await call_next(request)
+
+        if response.status_code >= 400:
+            logger.error(
+                f"Failed request: {request.method} {request.url} - "
+                f"Status: {response.status_code}"
+            )
+
+            response_body = b""
+            async for chunk in response.body_iterator:
+                response_body += chunk
+
+            try:
+                body_text = response_body.decode()
+                if body_text:
+                    logger.error(f"Error response body: {body_text}")
+            except Exception as e:
+                logger.error(f"Could not decode response body: {e}")
+
+            return Response(
+                content=response_body,
+                status_code=response.status_code,
+                headers=dict(response.headers),
+                media_type=response.media_type,
+            )
+
+        return response
+    except Exception as e:
+        logger.error(f"Middleware error: {e}")
+        raise
+
+
+def make_app(middleware: str) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/ok")
+    async def ok():
+        return {"ok": True}
+
+    @app.get("/error")
+    async def error():
+        raise HTTPException(status_code=404, detail="Player not found")
+
+    @app.get("/large-error")
+    async def large_error():
+        return PlainTextResponse("x" * LARGE_ERROR_BYTES, status_code=500)
+
+    # the rest of the production stack stays around the logging middleware,
+    # so its cost is measured the way requests actually pay it
+    for entry in main_app.user_middleware:
+        if entry.cls is not RequestLoggingMiddleware:
+            app.user_middleware.append(entry)
+        elif middleware == "buffering":
+            app.user_middleware.append(
+                Middleware(BaseHTTPMiddleware, dispatch=buffering_logging_middleware)
+            )
+        elif middleware == "streaming":
+            app.user_middleware.append(entry)
+    return app
+
+
+async def call(app: FastAPI, path: str):
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "server": ("bench", 80),
+        "client": ("127.0.0.1", 50000),
+        "root_path": "",
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": b"",
+        "headers": [(b"host", b"bench")],
+    }
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        pass
+
+    await app(scope, receive, send)
+
+
+async def measure(app: FastAPI, path: str, requests: int) -> float:
+    for _ in range(min(requests, 100)):
+        await call(app, path)
+    start = time.perf_counter()
+    for _ in range(requests):
+        await call(app, path)
+    return (time.perf_counter() - start) / requests * 1e6
+
+
+async def main(args: argparse.Namespace):
+    # the log lines are the same either way; this measures the middleware
+    logging.disable(logging.CRITICAL)
+
+    apps = {name: make_app(name) for name in ("none", "buffering", "streaming")}
+    print(f"{'path':<14}{'none':>10}{'buffering':>12}{'streaming':>12}  us/request")
+    for path in PATHS:
+        requests = args.requests if path != "/large-error" else args.requests // 20
+        timings = {
+            name: await measure(app, path, requests) for name, app in apps.items()
+        }
+        print(
+            f"{path:<14}{timings['none']:>10.1f}{timings['buffering']:>12.1f}"
+            f"{timings['streaming']:>12.1f}"
+            f"  overhead {timings['buffering'] - timings['none']:.1f}"
+            f" -> {timings['streaming'] - timings['none']:.1f}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Per-request overhead of the request logging middleware"
+    )
+    parser.add_argument("--requests", type=int, default=5000)
+    asyncio.run(main(parser.parse_args()))
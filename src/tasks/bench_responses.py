@@ -0,0 +1,121 @@
+import argparse
+import asyncio
+import time
+
+from fastapi import FastAPI
+
+from src.api_models import BonusCardEvent, PlayerEventsResponse, ScoreChangeEvent
+from src.enums import BonusCardEventType, BonusCardType, ScoreChangeType
+from src.utils.compression import CompressionMiddleware
+from src.utils.responses import ORJSONModelResponse
+
+ACCEPT_ENCODINGS = ("identity", "gzip", "br")
+
+
+def make_events(count: int) -> list[ScoreChangeEvent | BonusCardEvent]:
+    # shaped like a long-running player's /api/players/{id}/events
+    events = []
+    for i in range(count // 2):
+        events.append(
+            ScoreChangeEvent(
+                event_type="score-change",
+                subtype=ScoreChangeType.GAME_COMPLETED,
+                amount=12.5 + i % 7,
+                reason="Game completed",
+                sector_id=i % 40 + 1,
+                timestamp=1_700_000_000 + i * 60,
+                score_before=100.0 + i,
+                score_after=112.5 + i,
+            )
+        )
+        events.append(
+            BonusCardEvent(
+                event_type="bonus-card",
+                subtype=BonusCardEventType.RECEIVED,
+                bonus_type=list(BonusCardType)[i % len(BonusCardType)],
+                sector_id=i % 40 + 1,
+                timestamp=1_700_000_000 + i * 60 + 30,
+            )
+        )
+    return events
+
+
+def make_app(variant: str, events: list) -> FastAPI:
+    app = FastAPI()
+
+    if variant == "before":
+        # what the events route did: response_model validation, default encoder
+        @app.get("/events", response_model=PlayerEventsResponse)
+        async def events_before():
+            return {"events": iter(events)}
+    else:
+
+        @app.get("/events", response_model=PlayerEventsResponse)
+        async def events_after():
+            return ORJSONModelResponse(
+                PlayerEventsResponse.model_construct(events=list(events))
+            )
+
+        app.add_middleware(CompressionMiddleware)
+    return app
+
+
+async def call(app: FastAPI, accept_encoding: str) -> int:
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "server": ("bench", 80),
+        "client": ("127.0.0.1", 50000),
+        "root_path": "",
+        "path": "/events",
+        "raw_path": b"/events",
+        "query_string": b"",
+        "headers": [
+            (b"host", b"bench"),
+            (b"accept-encoding", accept_encoding.encode()),
+        ],
+    }
+    sent = 0
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        nonlocal sent
+        if message["type"] == "http.response.body":
+            sent += len(message.get("body", b""))
+
+    await app(scope, receive, send)
+    return sent
+
+
+async def measure(app: FastAPI, accept_encoding: str, requests: int):
+    await call(app, accept_encoding)
+    start = time.process_time()
+    for _ in range(requests):
+        sent = await call(app, accept_encoding)
+    return sent, (time.process_time() - start) / requests * 1000
+
+
+async def main(args: argparse.Namespace):
+    events = make_events(args.events)
+    apps = {variant: make_app(variant, events) for variant in ("before", "after")}
+
+    print(f"{args.events} events per response")
+    print(f"{'':<18}{'bytes':>10}{'cpu ms':>10}")
+    for variant, app in apps.items():
+        for accept_encoding in ACCEPT_ENCODINGS:
+            sent, cpu_ms = await measure(app, accept_encoding, args.requests)
+            print(f"{variant + ' ' + accept_encoding:<18}{sent:>10}{cpu_ms:>10.2f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Bytes on the wire and CPU per request for large JSON bodies"
+    )
+    parser.add_argument("--events", type=int, default=2000)
+    parser.add_argument("--requests", type=int, default=50)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,110 @@
+import argparse
+import asyncio
+import tempfile
+import time
+from pathlib import Path
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import (
+    async_sessionmaker,  # pyright: ignore[reportAttributeAccessIssue]
+    create_async_engine,
+)
+
+from src import stream_checker
+from src.db.db_models import DbBase, IgdbGame, User
+from src.enums import StreamPlatform
+from src.tasks.fake_stream_platforms import (
+    CATEGORIES,
+    FakePlatformsConfig,
+    start_fake_platforms_server,
+)
+
+PLATFORMS = [StreamPlatform.TWITCH, StreamPlatform.VK, StreamPlatform.KICK]
+
+
+def make_player(index: int, base_url: str) -> User:
+    username = f"streamer{index}"
+    platform = PLATFORMS[index % len(PLATFORMS)]
+    return User(
+        username=username,
+        password_hash="",
+        first_name=username,
+        url_handle=username,
+        main_platform=platform.value,
+        twitch_stream_link=f"https://twitch.tv/{username}",
+        vk_stream_link=f"{base_url}/vk/{username}",
+        kick_stream_link=f"https://kick.com/{username}",
+        sector_id=1,
+        total_score=0.0,
+        maps_completed=0,
+    )
+
+
+async def run(players_count: int, refreshes: int, base_url: str):
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        engine = create_async_engine(f"sqlite+aiosqlite:///{Path(tmp_dir) / 'b.db'}")
+        statements = 0
+
+        @event.listens_for(engine.sync_engine, "before_cursor_execute")
+        def count_statement(*args):
+            nonlocal statements
+            statements += 1
+
+        async with engine.begin() as conn:
+            await conn.run_sync(DbBase.metadata.create_all)
+
+        session_factory = async_sessionmaker(bind=engine, expire_on_commit=False)
+        async with session_factory() as db:
+            db.add_all(make_player(i, base_url) for i in range(players_count))
+            db.add_all(IgdbGame(name=name, cover=f"{name}.jpg") for name in CATEGORIES)
+            await db.commit()
+
+        for run_index in range(refreshes):
+            statements = 0
+            async with session_factory() as db:
+                start = time.perf_counter()
+                stats = await stream_checker.refresh_stream_statuses(db)
+                elapsed = time.perf_counter() - start
+            per_player_ms = elapsed / players_count * 1000
+
+            print(
+                f"players={players_count:5d} run={run_index + 1} "
+                f"time={elapsed:8.2f}s per_player={per_player_ms:7.1f}ms "
+                f"statements={statements:5d} online={stats['online_players']} "
+                f"updated={stats['updated_players']} errors={len(stats['errors'])}"
+            )
+
+        await engine.dispose()
+
+
+async def main(args: argparse.Namespace):
+    config = FakePlatformsConfig(
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        error_rate=args.error_rate,
+        live_ratio=args.live_ratio,
+        category_period_seconds=args.category_period_seconds,
+    )
+    base_url, server = start_fake_platforms_server(config)
+    stream_checker.TWITCH_API_URL = f"{base_url}/helix"
+    stream_checker.KICK_API_URL = f"{base_url}/kick"
+
+    try:
+        for players_count in args.players:
+            await run(players_count, args.refreshes, base_url)
+    finally:
+        server.should_exit = True
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Time refresh_stream_statuses against the fake stream platforms"
+    )
+    parser.add_argument("--players", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument("--refreshes", type=int, default=2)
+    parser.add_argument("--latency-ms", type=float, default=5.0)
+    parser.add_argument("--jitter-ms", type=float, default=2.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--live-ratio", type=float, default=0.5)
+    parser.add_argument("--category-period-seconds", type=float, default=120.0)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,144 @@
+import argparse
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+from lxml import html
+
+from src.stream_checker import (
+    VK_AVATAR_XPATH,
+    VK_CATEGORY_XPATH,
+    VK_CHUNK_SIZE,
+    VK_ONLINE_COUNT_XPATH,
+    _get_vk_page_data,
+    _parse_vk_page,
+    vk_page_cache,
+)
+from src.tasks.fake_stream_platforms import build_vk_page
+
+
+def legacy_parse(content: bytes) -> tuple[str, str]:
+    tree = html.fromstring(content)
+    tree.xpath(VK_AVATAR_XPATH + "/@src")
+    category = tree.xpath(VK_CATEGORY_XPATH)
+    online_count = tree.xpath(VK_ONLINE_COUNT_XPATH)
+    assert "StreamStatus_text" in content.decode()
+    return category[0].text.strip(), online_count[0].text
+
+
+def streaming_parse(content: bytes) -> tuple[tuple[str, str], int]:
+    consumed = 0
+
+    def chunks():
+        nonlocal consumed
+        for offset in range(0, len(content), VK_CHUNK_SIZE):
+            chunk = content[offset : offset + VK_CHUNK_SIZE]
+            consumed += len(chunk)
+            yield chunk
+
+    page = _parse_vk_page(chunks())
+    assert page.is_live and page.category and page.online_count
+    return (page.category.strip(), page.online_count), consumed
+
+
+PAGE_ETAG = '"bench"'
+
+
+class PageServer(ThreadingHTTPServer):
+    # answers If-None-Match like VK Play does, and counts the 304s it sends
+    def __init__(self, content: bytes):
+        super().__init__(("127.0.0.1", 0), PageHandler)
+        self.content = content
+        self.not_modified = 0
+
+
+class PageHandler(BaseHTTPRequestHandler):
+    server: PageServer
+
+    def do_GET(self):
+        if self.headers.get("If-None-Match") == PAGE_ETAG:
+            self.server.not_modified += 1
+            self.send_response(304)
+            self.send_header("ETag", PAGE_ETAG)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html")
+        self.send_header("Content-Length", str(len(self.server.content)))
+        self.send_header("ETag", PAGE_ETAG)
+        self.end_headers()
+        self.wfile.write(self.server.content)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def fetch_cpu(content: bytes, iterations: int) -> tuple[float, float]:
+    # the checker's own requests against a local server, without and with a
+    # cached ETag; the CPU is this thread's only, the server runs in another
+    server = PageServer(content)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_address[1]}/"
+    try:
+        start = time.thread_time()
+        for _ in range(iterations):
+            vk_page_cache.clear()
+            _get_vk_page_data(url)
+        full_cpu = (time.thread_time() - start) / iterations
+
+        start = time.thread_time()
+        for _ in range(iterations):
+            _get_vk_page_data(url)
+        revalidated_cpu = (time.thread_time() - start) / iterations
+        if server.not_modified != iterations:
+            raise RuntimeError(f"{server.not_modified}/{iterations} requests got 304")
+        return full_cpu, revalidated_cpu
+    finally:
+        server.shutdown()
+        vk_page_cache.clear()
+
+
+def bench(name: str, content: bytes, iterations: int):
+    expected = legacy_parse(content)
+    streamed, consumed = streaming_parse(content)
+    if streamed != expected:
+        raise RuntimeError(f"{name}: parse mismatch {streamed} != {expected}")
+
+    start = time.process_time()
+    for _ in range(iterations):
+        legacy_parse(content)
+    legacy_cpu = (time.process_time() - start) / iterations
+
+    start = time.process_time()
+    for _ in range(iterations):
+        streaming_parse(content)
+    streaming_cpu = (time.process_time() - start) / iterations
+
+    print(f"{name} ({len(content) / 1024:.1f} KiB page):")
+    report("full fetch + tree", len(content), legacy_cpu)
+    report("streaming + stop", consumed, streaming_cpu)
+    full_cpu, revalidated_cpu = fetch_cpu(content, iterations)
+    report("request (200)", consumed, full_cpu)
+    report("request (304)", 0, revalidated_cpu)
+
+
+def report(label: str, parsed_bytes: int, cpu_seconds: float):
+    kib = parsed_bytes / 1024
+    print(f"  {label:<20} {kib:10.1f} KiB {cpu_seconds * 1000:8.3f} ms cpu")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Compare full-tree and streaming VK Play page extraction"
+    )
+    parser.add_argument("pages", nargs="*", type=Path, help="saved VK Play pages")
+    parser.add_argument("--iterations", type=int, default=50)
+    parser.add_argument("--filler-kb", type=int, default=400)
+    args = parser.parse_args()
+
+    if args.pages:
+        for path in args.pages:
+            bench(path.name, path.read_bytes(), args.iterations)
+    else:
+        bench("synthetic", build_vk_page(filler_kb=args.filler_kb), args.iterations)
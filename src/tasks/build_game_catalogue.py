@@ -0,0 +1,32 @@
+import argparse
+import asyncio
+import os
+import time
+
+from src.config import GAME_CATALOGUE_PATH
+from src.db.db_session import get_session
+from src.utils.game_catalogue import build_game_catalogue, open_game_catalogue
+
+
+async def main(path: str):
+    start = time.perf_counter()
+    async with get_session() as db:
+        await build_game_catalogue(db, path)
+
+    catalogue = open_game_catalogue(path)
+    assert catalogue is not None
+    print(
+        f"Game catalogue written to {path} in {time.perf_counter() - start:.1f}s: "
+        f"{os.path.getsize(path) / 1024 / 1024:.1f} MiB, versions {catalogue.versions}"
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Compile igdb_games and hltb_games into the shared catalogue file"
+    )
+    parser.add_argument("--path", default=GAME_CATALOGUE_PATH)
+    args = parser.parse_args()
+    if not args.path:
+        parser.error("set GAME_CATALOGUE_PATH or pass --path")
+    asyncio.run(main(args.path))
@@ -0,0 +1,91 @@
+import asyncio
+import re
+import sys
+
+from sqlalchemy import desc, select, text
+
+from src.db.db_models import DiceRoll, Notification, PlayerCard, PlayerGame, PlayerMove
+from src.db.db_session import engine
+from src.enums import BonusCardStatus, GameCompletionType, PlayerMoveType
+
+# (name, query, index it should use); the predicates mirror the handlers'
+HOT_QUERIES = (
+    (
+        "active cards",
+        select(PlayerCard).where(
+            PlayerCard.player_id == 1,
+            PlayerCard.status == BonusCardStatus.ACTIVE.value,
+        ),
+        "ix_player_cards_player_id_status_card_type",
+    ),
+    (
+        "unused dice roll",
+        select(DiceRoll)
+        .where(DiceRoll.player_id == 1, DiceRoll.used == 0)
+        .order_by(desc(DiceRoll.created_at))
+        .limit(1),
+        "ix_dice_rolls_player_id_used_created_at",
+    ),
+    (
+        "unread notifications",
+        select(Notification)
+        .where(Notification.player_id == 1, Notification.is_read == 0)
+        .order_by(desc(Notification.created_at)),
+        "ix_notifications_player_id_is_read_created_at",
+    ),
+    (
+        "street tax games",
+        select(PlayerGame).where(
+            PlayerGame.sector_id == 1,
+            PlayerGame.type == GameCompletionType.COMPLETED.value,
+        ),
+        "ix_player_games_sector_id_type",
+    ),
+    (
+        "latest dice moves",
+        select(PlayerMove.id)
+        .where(
+            PlayerMove.player_id == 1,
+            PlayerMove.move_type == PlayerMoveType.DICE_ROLL.value,
+        )
+        .order_by(desc(PlayerMove.id))
+        .limit(10),
+        "ix_player_moves_player_id_move_type_id",
+    ),
+)
+
+
+def explain_prefix(dialect_name: str) -> str:
+    return "EXPLAIN QUERY PLAN " if dialect_name == "sqlite" else "EXPLAIN "
+
+
+def plan_uses_index(dialect_name: str, plan, index_name: str) -> bool:
+    # MySQL also names candidate indexes in possible_keys; only `key` is the
+    # one it picked
+    if dialect_name != "sqlite":
+        return any(row._mapping["key"] == index_name for row in plan)
+    used = re.compile(rf"USING (?:COVERING )?INDEX {re.escape(index_name)}\b")
+    return any(used.search(row._mapping["detail"]) for row in plan)
+
+
+async def main() -> int:
+    failed = 0
+    async with engine.connect() as conn:
+        for name, query, index_name in HOT_QUERIES:
+            sql = query.compile(
+                dialect=conn.dialect, compile_kwargs={"literal_binds": True}
+            )
+            plan = (
+                await conn.execute(text(explain_prefix(conn.dialect.name) + str(sql)))
+            ).all()
+            plan_text = " | ".join(
+                " ".join(str(value) for value in row) for row in plan
+            )
+            uses_index = plan_uses_index(conn.dialect.name, plan, index_name)
+            failed += not uses_index
+            print(f"{'ok' if uses_index else 'MISSING':<8} {name}: {plan_text}")
+    return failed
+
+
+if __name__ == "__main__":
+    sys.exit(1 if asyncio.run(main()) else 0)
@@ -0,0 +1,231 @@
+import argparse
+import asyncio
+import hashlib
+import random
+import socket
+import threading
+import time
+
+import uvicorn
+from fastapi import FastAPI, Request, Response
+from lxml import etree
+from pydantic import BaseModel
+
+from src.stream_checker import (
+    VK_AVATAR_XPATH,
+    VK_CATEGORY_XPATH,
+    VK_ONLINE_COUNT_XPATH,
+    _parse_xpath_steps,
+)
+
+CATEGORIES = [
+    "Elden Ring",
+    "Hollow Knight",
+    "Disco Elysium",
+    "Portal 2",
+    "Just Chatting",
+    "Hades",
+    "Outer Wilds",
+    "Slots & Casino",
+]
+
+
+class FakePlatformsConfig(BaseModel):
+    latency_ms: float = 20.0
+    jitter_ms: float = 10.0
+    error_rate: float = 0.0
+    live_ratio: float = 0.5
+    # every streamer goes live/offline once per period, shifted by a per-name
+    # offset, and switches category every category_period seconds while live
+    period_seconds: float = 600.0
+    category_period_seconds: float = 120.0
+    vk_filler_kb: int = 200
+
+
+class StreamState(BaseModel):
+    is_live: bool
+    category: str
+    viewers: int
+    avatar: str
+
+
+def _name_seed(name: str) -> int:
+    return int.from_bytes(hashlib.blake2b(name.encode(), digest_size=4).digest())
+
+
+def stream_state(config: FakePlatformsConfig, name: str, now: float) -> StreamState:
+    seed = _name_seed(name)
+    phase = ((now + seed % 10_000) % config.period_seconds) / config.period_seconds
+    slot = int((now + seed % 997) // config.category_period_seconds)
+    return StreamState(
+        is_live=phase < config.live_ratio,
+        category=CATEGORIES[(seed + slot) % len(CATEGORIES)],
+        viewers=100 + (seed + slot * 37) % 5000,
+        avatar=f"https://static.example/avatars/{name}.png",
+    )
+
+
+def build_vk_page(
+    category: str = "Sample Game",
+    online_count: int = 1234,
+    is_live: bool = True,
+    avatar: str = "//images.vkplay.live/avatar.png",
+    filler_kb: int = 400,
+) -> bytes:
+    root = etree.Element("html")
+    etree.SubElement(root, "head")
+    body = etree.SubElement(root, "body")
+
+    def ensure_path(xpath: str) -> etree._Element:
+        node = body
+        for tag, index in _parse_xpath_steps(xpath)[2:]:
+            children = [c for c in node if c.tag == tag]
+            while len(children) < (index or 1):
+                children.append(etree.SubElement(node, tag))
+            node = children[(index or 1) - 1]
+        return node
+
+    ensure_path(VK_AVATAR_XPATH).set("src", avatar)
+    if is_live:
+        category_link = ensure_path(VK_CATEGORY_XPATH)
+        category_link.text = category
+        ensure_path(VK_ONLINE_COUNT_XPATH).text = f"{online_count:,}"
+        status = etree.SubElement(category_link.getparent(), "span")
+        status.set("class", "StreamStatus_text_a1b2c")
+        status.text = "В эфире"
+
+    # VK Play ships the chat, recommendations and the serialized app state after
+    # the channel header, which is the bulk of the page
+    filler = etree.SubElement(body, "div")
+    for i in range(filler_kb):
+        item = etree.SubElement(filler, "div")
+        item.set("class", "ChatMessage_root")
+        item.text = f"message {i} " + "x" * 1000
+    script = etree.SubElement(body, "script")
+    script.text = '{"state": "' + "y" * filler_kb * 1024 + '"}'
+
+    return b"<!DOCTYPE html>" + etree.tostring(root, method="html")
+
+
+def create_fake_platforms_app(config: FakePlatformsConfig) -> FastAPI:
+    app = FastAPI()
+    vk_pages: dict[tuple[str, bool, str, int], bytes] = {}
+
+    async def simulate_network() -> Response | None:
+        delay = config.latency_ms + random.uniform(-1, 1) * config.jitter_ms
+        await asyncio.sleep(max(delay, 0) / 1000)
+        if random.random() < config.error_rate:
+            return Response(status_code=random.choice([429, 500, 503]))
+        return None
+
+    @app.get("/helix/users")
+    async def twitch_users(login: str):
+        error = await simulate_network()
+        if error:
+            return error
+        state = stream_state(config, login, time.time())
+        return {"data": [{"login": login, "profile_image_url": state.avatar}]}
+
+    @app.get("/helix/streams")
+    async def twitch_streams(user_login: str):
+        error = await simulate_network()
+        if error:
+            return error
+        state = stream_state(config, user_login, time.time())
+        if not state.is_live:
+            return {"data": []}
+        return {
+            "data": [
+                {
+                    "user_login": user_login,
+                    "type": "live",
+                    "game_name": state.category,
+                    "viewer_count": state.viewers,
+                }
+            ]
+        }
+
+    @app.get("/vk/{name}")
+    async def vk_channel(name: str, request: Request):
+        error = await simulate_network()
+        if error:
+            return error
+        state = stream_state(config, name, time.time())
+        key = (name, state.is_live, state.category, state.viewers)
+        etag = (
+            '"' + hashlib.blake2b(repr(key).encode(), digest_size=8).hexdigest() + '"'
+        )
+        if request.headers.get("if-none-match") == etag:
+            return Response(status_code=304, headers={"ETag": etag})
+
+        page = vk_pages.get(key)
+        if page is None:
+            page = build_vk_page(
+                state.category,
+                state.viewers,
+                state.is_live,
+                state.avatar,
+                config.vk_filler_kb,
+            )
+            vk_pages[key] = page
+        return Response(page, media_type="text/html", headers={"ETag": etag})
+
+    @app.get("/kick/channels/{name}")
+    async def kick_channel(name: str):
+        error = await simulate_network()
+        if error:
+            return error
+        state = stream_state(config, name, time.time())
+        livestream = None
+        if state.is_live:
+            livestream = {
+                "categories": [{"name": state.category, "viewers": state.viewers}]
+            }
+        return {"user": {"profile_pic": state.avatar}, "livestream": livestream}
+
+    return app
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_fake_platforms_server(
+    config: FakePlatformsConfig,
+) -> tuple[str, uvicorn.Server]:
+    port = _free_port()
+    server = uvicorn.Server(
+        uvicorn.Config(
+            create_fake_platforms_app(config),
+            host="127.0.0.1",
+            port=port,
+            log_level="warning",
+        )
+    )
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.01)
+    return f"http://127.0.0.1:{port}", server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Local stand-in for the Twitch Helix, VK Play and Kick endpoints"
+    )
+    parser.add_argument("--port", type=int, default=8100)
+    for name, field in FakePlatformsConfig.model_fields.items():
+        parser.add_argument(
+            f"--{name.replace('_', '-')}",
+            type=type(field.default),
+            default=field.default,
+        )
+    args = vars(parser.parse_args())
+    port = args.pop("port")
+
+    uvicorn.run(
+        create_fake_platforms_app(FakePlatformsConfig(**args)),
+        host="127.0.0.1",
+        port=port,
+    )
@@ -0,0 +1,153 @@
+import argparse
+import asyncio
+import csv
+import json
+import time
+from itertools import islice
+from pathlib import Path
+from typing import Callable, Iterable, Iterator
+
+from pydantic import BaseModel, ValidationError
+from sqlalchemy import Table
+
+from src.config import GAME_CATALOGUE_PATH
+from src.db.db_models import HltbGame, IgdbGame
+from src.db.db_session import engine, get_session
+from src.db.db_setup import GameData, HltbGameData
+from src.db.upsert import upsert_statement
+from src.utils.game_catalogue import build_game_catalogue
+from src.utils.game_names import game_key
+from src.utils.hltb import effective_length, is_pc_platform
+
+DEFAULT_BATCH_SIZE = 1000
+PROGRESS_SECONDS = 5
+# kept from the first import when a row is upserted again
+INSERT_ONLY_COLUMNS = {"created_at"}
+
+
+class IgdbGameData(GameData):
+    id: int
+
+
+def hltb_row(game: HltbGameData) -> dict:
+    # bulk core inserts skip the ORM before_insert/before_update listeners
+    # that fill the derived columns, so they are set here by hand
+    return {
+        **game.model_dump(),
+        "game_key": game_key(game.game_name),
+        "effective_length": effective_length(
+            game.comp_main, game.comp_plus, game.comp_100, game.comp_all
+        ),
+        "is_pc": int(is_pc_platform(game.profile_platform)),
+    }
+
+
+def igdb_row(game: IgdbGameData) -> dict:
+    return {**game.model_dump(), "game_key": game_key(game.name)}
+
+
+class ImportTable(BaseModel):
+    table: Table
+    data_model: type[BaseModel]
+    to_row: Callable[..., dict]
+
+    model_config = {"arbitrary_types_allowed": True}
+
+
+IMPORT_TABLES = {
+    "hltb": ImportTable(
+        table=HltbGame.__table__,  # pyright: ignore[reportArgumentType]
+        data_model=HltbGameData,
+        to_row=hltb_row,
+    ),
+    "igdb": ImportTable(
+        table=IgdbGame.__table__,  # pyright: ignore[reportArgumentType]
+        data_model=IgdbGameData,
+        to_row=igdb_row,
+    ),
+}
+
+
+def read_records(path: Path) -> Iterator[dict]:
+    with open(path, newline="", encoding="utf-8") as file:
+        if path.suffix.lower() == ".csv":
+            for record in csv.DictReader(file):
+                # an empty cell is a missing value, not an empty string
+                yield {key: value for key, value in record.items() if value != ""}
+        else:
+            for line in file:
+                if line.strip():
+                    yield json.loads(line)
+
+
+def read_rows(path: Path, import_table: ImportTable) -> Iterator[dict]:
+    for line_number, record in enumerate(read_records(path), start=1):
+        try:
+            game = import_table.data_model.model_validate(record)
+        except ValidationError as e:
+            raise SystemExit(f"{path}: record {line_number}: {e}") from e
+        yield import_table.to_row(game)
+
+
+def batched(rows: Iterable[dict], size: int) -> Iterator[list[dict]]:
+    iterator = iter(rows)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+async def import_catalogue(path: Path, table_name: str, batch_size: int) -> int:
+    import_table = IMPORT_TABLES[table_name]
+    table = import_table.table
+    statement = upsert_statement(
+        engine.dialect.name,
+        table,
+        [column.name for column in table.primary_key],
+        INSERT_ONLY_COLUMNS,
+    )
+
+    imported = 0
+    start = reported_at = time.perf_counter()
+    async with engine.connect() as conn:
+        # one transaction per batch keeps locks and memory bounded by the
+        # batch, however large the file is
+        for batch in batched(read_rows(path, import_table), batch_size):
+            await conn.execute(statement, batch)
+            await conn.commit()
+            imported += len(batch)
+
+            now = time.perf_counter()
+            if now - reported_at >= PROGRESS_SECONDS:
+                rate = imported / (now - start)
+                print(f"{table_name}: {imported} rows, {rate:.0f} rows/s")
+                reported_at = now
+
+    elapsed = time.perf_counter() - start
+    print(
+        f"{table_name}: imported {imported} rows from {path} in {elapsed:.1f}s "
+        f"({imported / max(elapsed, 1e-9):.0f} rows/s)"
+    )
+    return imported
+
+
+async def main(args: argparse.Namespace):
+    await import_catalogue(args.path, args.table, args.batch_size)
+
+    if GAME_CATALOGUE_PATH and not args.skip_catalogue:
+        async with get_session() as db:
+            await build_game_catalogue(db, GAME_CATALOGUE_PATH)
+        print(f"Game catalogue rebuilt at {GAME_CATALOGUE_PATH}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Upsert an HLTB or IGDB catalogue from JSON Lines or CSV"
+    )
+    parser.add_argument("table", choices=sorted(IMPORT_TABLES))
+    parser.add_argument("path", type=Path, help=".jsonl or .csv file")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument(
+        "--skip-catalogue",
+        action="store_true",
+        help="do not rebuild GAME_CATALOGUE_PATH after the import",
+    )
+    asyncio.run(main(parser.parse_args()))
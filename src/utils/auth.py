@@ -1,30 +1,115 @@
+import time
+
 from fastapi import Depends, HTTPException, Request, status
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
 from jose import JWTError
-from sqlalchemy import select
+from pydantic import BaseModel
+from sqlalchemy import event, inspect, select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.db.db_models import User
-from src.db.db_session import get_db
+from src.db.db_session import get_db, get_session
 from src.enums import Role
+from src.utils.cache import LruCache
 from src.utils.jwt import decode_access_token
 
+TOKEN_PRINCIPALS_SIZE = 1024
+TOKEN_PRINCIPAL_SECONDS = 60
+# a change to any of these drops every cached principal
+PRINCIPAL_ATTRIBUTES = ("id", "username", "role")
+
 security = HTTPBearer()
 
 
-def get_username(token: str):
+class TokenPrincipal(BaseModel):
+    user_id: int
+    username: str
+    role: str
+    cached_until: float
+
+
+# verified token -> who it belongs to, so a repeat request skips the JWT
+# check and the username lookup; kept per worker
+token_principals: LruCache[str, TokenPrincipal] = LruCache(TOKEN_PRINCIPALS_SIZE)
+
+
+def get_token_claims(token: str) -> dict:
     try:
         payload = decode_access_token(token)
-        username: str | None = payload.get("sub")
-        if username is None:
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token"
-            )
-        return username
     except JWTError:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token"
         )
+    if payload.get("sub") is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token"
+        )
+    return payload
+
+
+def get_username(token: str):
+    return get_token_claims(token)["sub"]
+
+
+def get_cached_principal(token: str) -> TokenPrincipal | None:
+    principal = token_principals.get(token)
+    if principal is not None and principal.cached_until <= time.time():
+        token_principals.pop(token)
+        return None
+    return principal
+
+
+def cache_principal(token: str, claims: dict, user: User) -> TokenPrincipal:
+    # never past the token's own expiry, which the cache no longer checks
+    cached_until = time.time() + TOKEN_PRINCIPAL_SECONDS
+    if "exp" in claims:
+        cached_until = min(cached_until, claims["exp"])
+    principal = TokenPrincipal(
+        user_id=user.id,
+        username=user.username,
+        role=user.role,
+        cached_until=cached_until,
+    )
+    token_principals.set(token, principal)
+    return principal
+
+
+@event.listens_for(User, "after_update")
+def _invalidate_principals_on_update(mapper, connection, target: User):
+    # other workers pick the change up within TOKEN_PRINCIPAL_SECONDS
+    state = inspect(target)
+    if any(state.attrs[name].history.has_changes() for name in PRINCIPAL_ATTRIBUTES):
+        token_principals.clear()
+
+
+@event.listens_for(User, "after_delete")
+def _invalidate_principals_on_delete(mapper, connection, target: User):
+    token_principals.clear()
+
+
+async def get_principal(token: str) -> TokenPrincipal | None:
+    # for code outside the dependencies, such as middleware; None when the
+    # token doesn't check out
+    principal = get_cached_principal(token)
+    if principal is not None:
+        return principal
+    try:
+        claims = get_token_claims(token)
+    except HTTPException:
+        return None
+    async with get_session() as db:
+        result = await db.execute(select(User).where(User.username == claims["sub"]))
+        user = result.scalars().first()
+    if user is None:
+        return None
+    return cache_principal(token, claims, user)
+
+
+def user_not_found(token: str) -> HTTPException:
+    token_principals.pop(token)
+    return HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED, detail="User not found"
+    )
 
 
 async def get_current_user(
@@ -35,22 +120,20 @@ async def get_current_user(
     allow_acting: bool = True,
 ):
     token = credentials.credentials
-    username = get_username(token)
-
-    # Fetch the user making the request
-    query = select(User).where(User.username == username)
-    result = await db.execute(query)
-    requesting_user = result.scalars().first()
-
-    if requesting_user is None:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED, detail="User not found"
-        )
+    requesting_user = None
+    principal = get_cached_principal(token)
+    if principal is None:
+        claims = get_token_claims(token)
+        result = await db.execute(select(User).where(User.username == claims["sub"]))
+        requesting_user = result.scalars().first()
+        if requesting_user is None:
+            raise user_not_found(token)
+        principal = cache_principal(token, claims, requesting_user)
 
     # Check if an admin is acting as another user
     acting_user_id_str = request.headers.get("x-acting-user-id")
     is_acting = (
-        allow_acting and requesting_user.role == Role.ADMIN.value and acting_user_id_str
+        allow_acting and principal.role == Role.ADMIN.value and acting_user_id_str
     )
 
     if is_acting and acting_user_id_str:
@@ -68,17 +151,23 @@ async def get_current_user(
             )
         return target_user
 
-    # If not acting, but a lock is requested for the original user
+    # If not acting, but a lock is requested for the original user, the
+    # locked read is the only query
     if for_update:
-        # Re-fetch the original user with a lock
         locked_query = (
-            select(User).where(User.id == requesting_user.id).with_for_update()
+            select(User).where(User.id == principal.user_id).with_for_update()
         )
         locked_result = await db.execute(locked_query)
-        # The user must exist, so we can safely return it
-        return locked_result.scalars().first()
+        locked_user = locked_result.scalars().first()
+        if locked_user is None:
+            raise user_not_found(token)
+        return locked_user
 
-    # Otherwise, return the user we already fetched
+    # Otherwise, return the user we already fetched, or load it by id
+    if requesting_user is None:
+        requesting_user = await db.get(User, principal.user_id)
+        if requesting_user is None:
+            raise user_not_found(token)
     return requesting_user
 
 
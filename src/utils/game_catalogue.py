@@ -0,0 +1,385 @@
+import asyncio
+import fcntl
+import json
+import logging
+import mmap
+import os
+import struct
+import tempfile
+import time
+from array import array
+from typing import Iterable
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.config import GAME_CATALOGUE_PATH
+from src.db.db_models import HltbGame, IgdbGame
+from src.db.db_session import get_session
+from src.utils.hltb_index import HltbLengthIndex, get_hltb_version
+from src.utils.igdb_index import IgdbIndex, get_igdb_version
+
+logger = logging.getLogger(__name__)
+
+CATALOGUE_MAGIC = b"IGRPCAT2"
+CATALOGUE_CHECK_SECONDS = 60
+CATALOGUE_LOCK_POLL_SECONDS = 0.5
+SECTION_ALIGN = 8
+
+# hltb.flags bits
+HLTB_PC_GAME = 1
+
+IGDB_COLUMNS = (
+    IgdbGame.id,
+    IgdbGame.name,
+    IgdbGame.cover,
+    IgdbGame.release_year,
+    IgdbGame.game_key,
+    IgdbGame.updated_at,
+)
+HLTB_COLUMNS = (
+    HltbGame.game_id,
+    HltbGame.game_name,
+    HltbGame.game_type,
+    HltbGame.is_pc,
+    HltbGame.effective_length,
+    HltbGame.comp_main,
+    HltbGame.comp_plus,
+    HltbGame.comp_100,
+    HltbGame.comp_all,
+    HltbGame.updated_at,
+)
+
+
+class StringColumn:
+    # UTF-8 values packed back to back in `blob`; value i spans
+    # offsets[i]:offsets[i + 1]
+    def __init__(self, offsets, blob, empty_as_none: bool = False):
+        self.offsets = offsets
+        self.blob = blob
+        self.empty_as_none = empty_as_none
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __getitem__(self, row: int) -> str:
+        start, end = self.offsets[row], self.offsets[row + 1]
+        if start == end and self.empty_as_none:
+            return None  # pyright: ignore[reportReturnType]
+        return str(self.blob[start:end], "utf-8")
+
+
+def pack_strings(values: Iterable[str | None]) -> tuple[array, bytes]:
+    offsets = array("I", [0])
+    blob = bytearray()
+    for value in values:
+        blob += (value or "").encode()
+        offsets.append(len(blob))
+    return offsets, bytes(blob)
+
+
+def _aligned(size: int) -> int:
+    return -(-size // SECTION_ALIGN) * SECTION_ALIGN
+
+
+class GameCatalogue:
+    # read-only mapping of a catalogue file; every worker maps the same file
+    # so the columns live once in the page cache instead of once per process
+    def __init__(self, path: str):
+        with open(path, "rb") as file:
+            self.inode = os.fstat(file.fileno()).st_ino
+            self._map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        view = memoryview(self._map)
+        if view[: len(CATALOGUE_MAGIC)] != CATALOGUE_MAGIC:
+            raise ValueError(f"{path} is not a game catalogue")
+        header_start = len(CATALOGUE_MAGIC) + 4
+        (header_size,) = struct.unpack_from("<I", self._map, len(CATALOGUE_MAGIC))
+        header = json.loads(bytes(view[header_start : header_start + header_size]))
+        data_start = _aligned(header_start + header_size)
+
+        self.versions: dict[str, tuple[int, ...]] = {
+            table: tuple(version) for table, version in header["versions"].items()
+        }
+        self.sections: dict[str, memoryview] = {}
+        for name, (offset, typecode, count) in header["sections"].items():
+            start = data_start + offset
+            size = count * array(typecode).itemsize
+            self.sections[name] = view[start : start + size].cast(typecode)
+
+    def replaced(self, path: str) -> bool:
+        # an import that rewrites rows in place keeps the versions, so the
+        # importer rebuilds the file and workers notice the new inode
+        try:
+            return os.stat(path).st_ino != self.inode
+        except FileNotFoundError:
+            return True
+
+    def column(self, name: str) -> memoryview:
+        return self.sections[name]
+
+    def strings(self, name: str, empty_as_none: bool = False) -> StringColumn:
+        return StringColumn(
+            self.sections[f"{name}.offsets"],
+            self.sections[f"{name}.blob"],
+            empty_as_none,
+        )
+
+
+def write_catalogue_file(
+    path: str, versions: dict[str, tuple[int, ...]], sections: dict[str, array]
+):
+    # columns are written in native byte order; the file is built on the host
+    # whose workers map it
+    layout = {}
+    offset = 0
+    for name, column in sections.items():
+        layout[name] = [offset, column.typecode, len(column)]
+        offset = _aligned(offset + len(column) * column.itemsize)
+    header = json.dumps({"versions": versions, "sections": layout}).encode()
+
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    with tempfile.NamedTemporaryFile("wb", dir=directory, delete=False) as file:
+        file.write(CATALOGUE_MAGIC)
+        file.write(struct.pack("<I", len(header)))
+        file.write(header)
+        data_start = _aligned(file.tell())
+        for name, column in sections.items():
+            file.write(b"\0" * (data_start + layout[name][0] - file.tell()))
+            column.tofile(file)
+        file.flush()
+        os.fsync(file.fileno())
+    # NamedTemporaryFile creates the file private to its owner
+    os.chmod(file.name, 0o644)
+    # readers keep the old inode mapped until they reopen the path
+    os.replace(file.name, path)
+
+
+def igdb_sections(index: IgdbIndex) -> dict[str, array]:
+    sections = {
+        "igdb.ids": index.ids,
+        "igdb.release_years": index.release_years,
+        "igdb.trigram_counts": index.trigram_counts,
+        "igdb.order": index.order,
+    }
+    for name, values in (
+        ("igdb.names", index.names),
+        ("igdb.covers", index.covers),
+        ("igdb.game_keys", index.game_keys),
+    ):
+        sections[f"{name}.offsets"], blob = pack_strings(values)
+        sections[f"{name}.blob"] = array("B", blob)
+
+    trigrams = sorted(index.postings)
+    sections["igdb.trigrams.offsets"], blob = pack_strings(trigrams)
+    sections["igdb.trigrams.blob"] = array("B", blob)
+    posting_offsets = array("I", [0])
+    postings = array("I")
+    for trigram in trigrams:
+        postings.extend(index.postings[trigram])
+        posting_offsets.append(len(postings))
+    sections["igdb.postings.offsets"] = posting_offsets
+    sections["igdb.postings"] = postings
+    return sections
+
+
+class CataloguePostings:
+    # trigram -> slice of the shared postings column
+    def __init__(self, catalogue: GameCatalogue):
+        trigrams = catalogue.strings("igdb.trigrams")
+        self.offsets = catalogue.column("igdb.postings.offsets")
+        self.postings = catalogue.column("igdb.postings")
+        self.rows = {trigrams[i]: i for i in range(len(trigrams))}
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def get(self, trigram: str, default=None):
+        i = self.rows.get(trigram)
+        if i is None:
+            return default
+        return self.postings[self.offsets[i] : self.offsets[i + 1]]
+
+
+def igdb_index_from_catalogue(catalogue: GameCatalogue) -> IgdbIndex:
+    index = IgdbIndex(catalogue.versions["igdb"])
+    index.catalogue = catalogue
+    index.ids = catalogue.column("igdb.ids")
+    index.release_years = catalogue.column("igdb.release_years")
+    index.trigram_counts = catalogue.column("igdb.trigram_counts")
+    index.order = catalogue.column("igdb.order")
+    index.names = catalogue.strings("igdb.names")
+    index.covers = catalogue.strings("igdb.covers", empty_as_none=True)
+    index.game_keys = catalogue.strings("igdb.game_keys")
+    index.postings = CataloguePostings(catalogue)
+    return index
+
+
+def hltb_sections(rows) -> dict[str, array]:
+    rows = sorted(rows, key=lambda row: row.game_id)
+    sections = {
+        "hltb.game_ids": array("i", (row.game_id for row in rows)),
+        "hltb.comp_main": array("i", (row.comp_main for row in rows)),
+        "hltb.comp_plus": array("i", (row.comp_plus for row in rows)),
+        "hltb.comp_100": array("i", (row.comp_100 for row in rows)),
+        "hltb.comp_all": array("i", (row.comp_all for row in rows)),
+        "hltb.effective_lengths": array("i", (row.effective_length for row in rows)),
+        "hltb.flags": array(
+            "B",
+            (
+                HLTB_PC_GAME if row.game_type == "game" and row.is_pc else 0
+                for row in rows
+            ),
+        ),
+    }
+    sections["hltb.names.offsets"], blob = pack_strings(row.game_name for row in rows)
+    sections["hltb.names.blob"] = array("B", blob)
+    return sections
+
+
+def hltb_index_from_catalogue(catalogue: GameCatalogue) -> HltbLengthIndex:
+    game_ids = catalogue.column("hltb.game_ids")
+    flags = catalogue.column("hltb.flags")
+    lengths = catalogue.column("hltb.effective_lengths")
+    index = HltbLengthIndex(
+        catalogue.versions["hltb"],
+        (
+            (length, game_id)
+            for game_id, flag, length in zip(game_ids, flags, lengths)
+            if flag & HLTB_PC_GAME
+        ),
+    )
+    index.catalogue = catalogue
+    return index
+
+
+async def get_catalogue_versions(db: AsyncSession) -> dict[str, tuple[int, ...]]:
+    return {
+        "igdb": await get_igdb_version(db),
+        "hltb": await get_hltb_version(db),
+    }
+
+
+def write_game_catalogue(path: str, igdb_rows, hltb_rows):
+    # stamp with what was actually read so a concurrent import shows up as a
+    # version mismatch on the next check
+    index = IgdbIndex(
+        (
+            len(igdb_rows),
+            max((row[0] for row in igdb_rows), default=0),
+            max((row[5] or 0 for row in igdb_rows), default=0),
+        )
+    )
+    index.extend(row[:5] for row in igdb_rows)
+    versions = {
+        "igdb": index.version,
+        "hltb": (
+            len(hltb_rows),
+            max((row.game_id for row in hltb_rows), default=0),
+            max((row.updated_at or 0 for row in hltb_rows), default=0),
+        ),
+    }
+    write_catalogue_file(
+        path, versions, {**igdb_sections(index), **hltb_sections(hltb_rows)}
+    )
+
+
+async def build_game_catalogue(db: AsyncSession, path: str):
+    igdb_rows = (await db.execute(select(*IGDB_COLUMNS))).tuples().all()
+    hltb_rows = (await db.execute(select(*HLTB_COLUMNS))).all()
+    # the trigram index takes seconds of CPU on the full table
+    await asyncio.to_thread(write_game_catalogue, path, igdb_rows, hltb_rows)
+
+
+def open_game_catalogue(path: str) -> GameCatalogue | None:
+    try:
+        return GameCatalogue(path)
+    except (OSError, ValueError):
+        return None
+
+
+async def rebuild_game_catalogue(
+    versions: dict[str, tuple[int, ...]], path: str
+) -> GameCatalogue:
+    # one worker rebuilds, the others wait for its file
+    while True:
+        with open(f"{path}.lock", "w") as lock_file:
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                await asyncio.sleep(CATALOGUE_LOCK_POLL_SECONDS)
+                continue
+
+            catalogue = open_game_catalogue(path)
+            if catalogue is None or catalogue.versions != versions:
+                # a session of its own, the request that noticed is long gone
+                async with get_session() as db:
+                    await build_game_catalogue(db, path)
+                catalogue = open_game_catalogue(path)
+            if catalogue is None:
+                raise RuntimeError(f"failed to build game catalogue at {path}")
+            return catalogue
+
+
+game_catalogue: GameCatalogue | None = None
+game_catalogue_checked_at = 0.0
+game_catalogue_lock = asyncio.Lock()
+game_catalogue_rebuild: asyncio.Task | None = None
+
+
+async def refresh_game_catalogue(versions: dict[str, tuple[int, ...]]):
+    global game_catalogue
+    try:
+        game_catalogue = await rebuild_game_catalogue(versions, GAME_CATALOGUE_PATH)
+    except Exception:
+        logger.exception("Failed to rebuild game catalogue at %s", GAME_CATALOGUE_PATH)
+
+
+def start_game_catalogue_rebuild(
+    versions: dict[str, tuple[int, ...]],
+) -> asyncio.Task:
+    global game_catalogue_rebuild
+    if game_catalogue_rebuild is None or game_catalogue_rebuild.done():
+        game_catalogue_rebuild = asyncio.create_task(refresh_game_catalogue(versions))
+    return game_catalogue_rebuild
+
+
+async def get_game_catalogue(db: AsyncSession) -> GameCatalogue:
+    # a stale catalogue keeps being served while a background task rebuilds
+    # it; only a worker with nothing mapped yet waits for the build
+    global game_catalogue, game_catalogue_checked_at
+
+    if (
+        game_catalogue is not None
+        and time.monotonic() - game_catalogue_checked_at < CATALOGUE_CHECK_SECONDS
+    ):
+        return game_catalogue
+
+    async with game_catalogue_lock:
+        if (
+            game_catalogue is None
+            or time.monotonic() - game_catalogue_checked_at >= CATALOGUE_CHECK_SECONDS
+        ):
+            versions = await get_catalogue_versions(db)
+            if (
+                game_catalogue is None
+                or game_catalogue.versions != versions
+                or game_catalogue.replaced(GAME_CATALOGUE_PATH)
+            ):
+                catalogue = open_game_catalogue(GAME_CATALOGUE_PATH)
+                if catalogue is not None and catalogue.versions == versions:
+                    game_catalogue = catalogue
+                else:
+                    rebuild = start_game_catalogue_rebuild(versions)
+                    game_catalogue = game_catalogue or catalogue
+                    if game_catalogue is None:
+                        # shielded so a cancelled request leaves the build running
+                        await asyncio.shield(rebuild)
+                    if game_catalogue is None:
+                        raise RuntimeError(
+                            f"no game catalogue at {GAME_CATALOGUE_PATH}"
+                        )
+            game_catalogue_checked_at = time.monotonic()
+
+    return game_catalogue
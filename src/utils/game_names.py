@@ -0,0 +1,21 @@
+import re
+import unicodedata
+
+# dropped outright so "Assassin's" and "Assassins" agree
+KEY_DROPPED_CHARS = re.compile(r"['’‘`™®©]")
+KEY_SEPARATORS = re.compile(r"[\W_]+")
+# game_key columns are String(255)
+GAME_KEY_MAX_LENGTH = 255
+
+
+def clean_game_name(game_name: str) -> str:
+    return re.sub(r"\s*\(\d{4}\)$", "", game_name).strip()
+
+
+def game_key(game_name: str) -> str:
+    # one spelling per game across IGDB, HLTB, stream categories and player
+    # entries: "ELDEN RING (2022)", "Elden Ring" and "elden  ring" share a key,
+    # as do "Half-Life 2" and "Half Life 2"
+    name = KEY_DROPPED_CHARS.sub("", clean_game_name(game_name))
+    name = unicodedata.normalize("NFKC", name).casefold()
+    return " ".join(KEY_SEPARATORS.sub(" ", name).split())[:GAME_KEY_MAX_LENGTH]
@@ -0,0 +1,8 @@
+def effective_length(comp_main: int, comp_plus: int, comp_100: int, comp_all: int):
+    # the first known completion time, 0 when none is known
+    return comp_main or comp_plus or comp_100 or comp_all
+
+
+def is_pc_platform(profile_platform: str | None) -> bool:
+    # case-insensitive like the LOWER(...) LIKE '%pc%' backfill
+    return "pc" in (profile_platform or "").lower()
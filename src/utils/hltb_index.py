@@ -0,0 +1,103 @@
+import asyncio
+import random
+import time
+from array import array
+from bisect import bisect_left, bisect_right
+from typing import TYPE_CHECKING, Iterable
+
+from sqlalchemy import and_, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.config import GAME_CATALOGUE_PATH
+from src.db.db_models import HltbGame
+
+if TYPE_CHECKING:
+    from src.utils.game_catalogue import GameCatalogue
+
+HLTB_INDEX_CHECK_SECONDS = 60
+
+
+class HltbLengthIndex:
+    # ids of PC games sorted by effective length, so picking games of a given
+    # length is two bisects and a few random offsets
+    def __init__(self, version: tuple[int, int, int], games: Iterable[tuple[int, int]]):
+        pairs = sorted(games)
+        self.version = version
+        self.lengths = array("i", (length for length, _ in pairs))
+        self.game_ids = array("i", (game_id for _, game_id in pairs))
+        self.catalogue: "GameCatalogue | None" = None
+
+    def __len__(self) -> int:
+        return len(self.game_ids)
+
+    def sample(self, min_length: int, max_length: int | None, limit: int) -> list[int]:
+        start = bisect_left(self.lengths, min_length)
+        end = len(self.lengths)
+        if max_length is not None:
+            end = bisect_right(self.lengths, max_length)
+        picks = random.sample(range(start, end), min(limit, max(end - start, 0)))
+        return [self.game_ids[i] for i in picks]
+
+
+hltb_index: HltbLengthIndex | None = None
+hltb_index_checked_at = 0.0
+hltb_index_lock = asyncio.Lock()
+
+
+async def get_hltb_version(db: AsyncSession) -> tuple[int, int, int]:
+    # count and max id catch inserts and deletes, the newest updated_at
+    # catches rows rewritten in place by an import or an edit
+    query = await db.execute(
+        select(
+            func.count(HltbGame.game_id),
+            func.max(HltbGame.game_id),
+            func.max(HltbGame.updated_at),
+        )
+    )
+    count, max_id, max_updated_at = query.one()
+    return count or 0, max_id or 0, max_updated_at or 0
+
+
+async def _load_hltb_index(
+    db: AsyncSession, version: tuple[int, int, int]
+) -> HltbLengthIndex:
+    # served by ix_hltb_games_type_pc_length without touching the table
+    query = await db.execute(
+        select(HltbGame.effective_length, HltbGame.game_id).where(
+            and_(HltbGame.game_type == "game", HltbGame.is_pc == 1)
+        )
+    )
+    return HltbLengthIndex(version, query.tuples().all())
+
+
+async def get_hltb_index(db: AsyncSession) -> HltbLengthIndex:
+    global hltb_index, hltb_index_checked_at
+
+    if GAME_CATALOGUE_PATH:
+        from src.utils.game_catalogue import (
+            get_game_catalogue,
+            hltb_index_from_catalogue,
+        )
+
+        catalogue = await get_game_catalogue(db)
+        if hltb_index is None or hltb_index.catalogue is not catalogue:
+            hltb_index = hltb_index_from_catalogue(catalogue)
+        return hltb_index
+
+    if (
+        hltb_index is not None
+        and time.monotonic() - hltb_index_checked_at < HLTB_INDEX_CHECK_SECONDS
+    ):
+        return hltb_index
+
+    async with hltb_index_lock:
+        if (
+            hltb_index is None
+            or time.monotonic() - hltb_index_checked_at >= HLTB_INDEX_CHECK_SECONDS
+        ):
+            version = await get_hltb_version(db)
+            if hltb_index is None or hltb_index.version != version:
+                hltb_index = await _load_hltb_index(db, version)
+            hltb_index_checked_at = time.monotonic()
+
+    return hltb_index
@@ -0,0 +1,257 @@
+import asyncio
+import heapq
+import time
+from array import array
+from bisect import bisect_left
+from typing import TYPE_CHECKING, Iterable
+
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.config import GAME_CATALOGUE_PATH
+from src.db.db_models import IgdbGame
+from src.utils.cache import LruCache
+from src.utils.game_names import game_key
+
+if TYPE_CHECKING:
+    from src.utils.game_catalogue import GameCatalogue
+
+IGDB_INDEX_CHECK_SECONDS = 60
+GAME_COVER_MISSES_SIZE = 1024
+SEARCH_CANDIDATES_CACHE_SIZE = 256
+# broader queries are cheap to recompute from postings and costly to hold
+SEARCH_CANDIDATES_CACHE_MAX_ROWS = 20_000
+
+# sorts after any character a game key can contain
+PREFIX_END = "\U0010ffff"
+EMPTY_POSTINGS = array("I")
+
+
+def trigrams(text: str) -> set[str]:
+    return {text[i : i + 3] for i in range(len(text) - 2)}
+
+
+class IgdbIndex:
+    # column-oriented copy of igdb_games; `order` holds row numbers sorted by
+    # game key so a prefix lookup is two bisects, and `postings` maps
+    # each trigram to the ascending row numbers of names containing it
+    def __init__(self, version: tuple[int, int, int]):
+        self.version = version
+        self.ids = array("i")
+        self.names: list[str] = []
+        self.covers: list[str | None] = []
+        self.release_years = array("i")
+        self.game_keys: list[str] = []
+        self.trigram_counts = array("H")
+        self.order = array("I")
+        self.postings: dict[str, array] = {}
+        # set when the columns are views of a mapped GameCatalogue
+        self.catalogue: "GameCatalogue | None" = None
+        # query key -> every matching row, so the next keystroke only
+        # filters the previous query's candidates
+        self.search_candidates: LruCache[str, array] = LruCache(
+            SEARCH_CANDIDATES_CACHE_SIZE
+        )
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def _sort_key(self, row: int) -> tuple[str, str]:
+        return self.game_keys[row], self.names[row]
+
+    def extend(
+        self, rows: Iterable[tuple[int, str, str | None, int | None, str | None]]
+    ):
+        first_row = len(self.ids)
+        for game_id, name, cover, release_year, name_key in rows:
+            row = len(self.ids)
+            # rows written before the game_key backfill carry no key yet
+            name_key = name_key or game_key(name)
+            name_trigrams = trigrams(name_key)
+
+            self.ids.append(game_id)
+            self.names.append(name)
+            self.covers.append(cover)
+            self.release_years.append(release_year or 0)
+            self.game_keys.append(name_key)
+            self.trigram_counts.append(min(len(name_trigrams), 0xFFFF))
+            for trigram in name_trigrams:
+                postings = self.postings.get(trigram)
+                if postings is None:
+                    postings = self.postings[trigram] = array("I")
+                postings.append(row)
+
+        new_rows = sorted(range(first_row, len(self.ids)), key=self._sort_key)
+        self.order = array("I", heapq.merge(self.order, new_rows, key=self._sort_key))
+        self.search_candidates.clear()
+
+    def prefix_range(self, prefix: str) -> tuple[int, int]:
+        key = self.game_keys.__getitem__
+        start = bisect_left(self.order, prefix, key=key)
+        end = bisect_left(self.order, prefix + PREFIX_END, lo=start, key=key)
+        return start, end
+
+    def first_with_prefix(self, prefix: str) -> int | None:
+        start, end = self.prefix_range(prefix)
+        if start == end:
+            return None
+        return self.order[start]
+
+    def candidate_superset(self, needle: str) -> array:
+        # every trigram of the needle occurs in a matching name, so the rarest
+        # one bounds the candidates, unless the previous keystroke's matches
+        # are fewer
+        rows = min(
+            (
+                self.postings.get(trigram, EMPTY_POSTINGS)
+                for trigram in trigrams(needle)
+            ),
+            key=len,
+        )
+        for end in range(len(needle) - 1, 2, -1):
+            cached = self.search_candidates.get(needle[:end])
+            if cached is not None:
+                return cached if len(cached) < len(rows) else rows
+        return rows
+
+    def substring_rows(self, needle: str) -> array:
+        rows = self.search_candidates.get(needle)
+        if rows is None:
+            names = self.game_keys
+            rows = array(
+                "I",
+                (
+                    row
+                    for row in self.candidate_superset(needle)
+                    if needle in names[row]
+                ),
+            )
+            if len(rows) <= SEARCH_CANDIDATES_CACHE_MAX_ROWS:
+                self.search_candidates.set(needle, rows)
+        return rows
+
+    def rank_key(self, row: int, needle: str, needle_trigrams: int):
+        name = self.game_keys[row]
+        return (
+            not name.startswith(needle),
+            -needle_trigrams / max(self.trigram_counts[row], 1),
+            -self.release_years[row],
+            name,
+        )
+
+    def search(self, query: str, limit: int) -> list[int]:
+        needle = game_key(query)
+        if not needle:
+            return []
+
+        if len(needle) < 3:
+            # one or two characters match most of the catalogue as a substring,
+            # so short queries complete name prefixes in alphabetical order
+            start, end = self.prefix_range(needle)
+            return list(self.order[start : min(end, start + limit)])
+
+        needle_trigrams = len(trigrams(needle))
+        return heapq.nsmallest(
+            limit,
+            self.substring_rows(needle),
+            key=lambda row: self.rank_key(row, needle, needle_trigrams),
+        )
+
+    def summary(self, row: int) -> dict:
+        return {
+            "id": self.ids[row],
+            "name": self.names[row],
+            "cover": self.covers[row],
+            "release_year": self.release_years[row] or None,
+        }
+
+
+igdb_index: IgdbIndex | None = None
+igdb_index_checked_at = 0.0
+igdb_index_lock = asyncio.Lock()
+
+# category keys with no IGDB match, e.g. "just chatting"
+game_cover_misses: LruCache[str, bool] = LruCache(GAME_COVER_MISSES_SIZE)
+
+
+async def get_igdb_version(db: AsyncSession) -> tuple[int, int, int]:
+    # count and max id catch inserts and deletes, the newest updated_at
+    # catches renames and cover changes made in place
+    query = await db.execute(
+        select(
+            func.count(IgdbGame.id),
+            func.max(IgdbGame.id),
+            func.max(IgdbGame.updated_at),
+        )
+    )
+    count, max_id, max_updated_at = query.one()
+    return count or 0, max_id or 0, max_updated_at or 0
+
+
+async def _load_igdb_index(
+    db: AsyncSession, version: tuple[int, int, int]
+) -> IgdbIndex:
+    # rebuilt whole: a changed row can sit anywhere in the postings and the
+    # key order, so appending the new ids isn't enough
+    index = IgdbIndex(version)
+    query = await db.execute(
+        select(
+            IgdbGame.id,
+            IgdbGame.name,
+            IgdbGame.cover,
+            IgdbGame.release_year,
+            IgdbGame.game_key,
+        )
+    )
+    index.extend(query.tuples().all())
+    return index
+
+
+async def get_igdb_index(db: AsyncSession) -> IgdbIndex:
+    global igdb_index, igdb_index_checked_at
+
+    if GAME_CATALOGUE_PATH:
+        from src.utils.game_catalogue import (
+            get_game_catalogue,
+            igdb_index_from_catalogue,
+        )
+
+        catalogue = await get_game_catalogue(db)
+        if igdb_index is None or igdb_index.catalogue is not catalogue:
+            igdb_index = igdb_index_from_catalogue(catalogue)
+            game_cover_misses.clear()
+        return igdb_index
+
+    if (
+        igdb_index is not None
+        and time.monotonic() - igdb_index_checked_at < IGDB_INDEX_CHECK_SECONDS
+    ):
+        return igdb_index
+
+    async with igdb_index_lock:
+        if (
+            igdb_index is None
+            or time.monotonic() - igdb_index_checked_at >= IGDB_INDEX_CHECK_SECONDS
+        ):
+            version = await get_igdb_version(db)
+            if igdb_index is None or igdb_index.version != version:
+                igdb_index = await _load_igdb_index(db, version)
+                game_cover_misses.clear()
+            igdb_index_checked_at = time.monotonic()
+
+    return igdb_index
+
+
+async def resolve_game_cover(db: AsyncSession, game_name: str) -> str | None:
+    prefix = game_key(game_name)
+    if prefix in game_cover_misses:
+        game_cover_misses.get(prefix)
+        return None
+
+    index = await get_igdb_index(db)
+    row = index.first_with_prefix(prefix)
+    if row is None:
+        game_cover_misses.set(prefix, True)
+        return None
+
+    return index.covers[row]
@@ -0,0 +1,43 @@
+from typing import Protocol
+
+from sqlalchemy import case, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.config import IGDB_SEARCH_BACKEND
+from src.db.db_models import IgdbGame
+from src.utils.igdb_index import get_igdb_index
+
+
+class IgdbSearchBackend(Protocol):
+    async def search(self, db: AsyncSession, query: str, limit: int) -> list: ...
+
+
+class MemoryIgdbSearch:
+    # substring matches from the trigram index, ranked by prefix match, trigram
+    # similarity and release year
+    async def search(self, db: AsyncSession, query: str, limit: int) -> list:
+        index = await get_igdb_index(db)
+        return [index.summary(row) for row in index.search(query, limit)]
+
+
+class SqlIgdbSearch:
+    async def search(self, db: AsyncSession, query: str, limit: int) -> list:
+        search_query = (
+            select(IgdbGame)
+            .where(IgdbGame.name.ilike(f"%{query}%"))
+            .order_by(
+                case((IgdbGame.name.ilike(f"{query}%"), 0), else_=1), IgdbGame.name
+            )
+            .limit(limit)
+        )
+
+        result = await db.execute(search_query)
+        return list(result.scalars().all())
+
+
+IGDB_SEARCH_BACKENDS: dict[str, type[IgdbSearchBackend]] = {
+    "memory": MemoryIgdbSearch,
+    "sql": SqlIgdbSearch,
+}
+
+igdb_search: IgdbSearchBackend = IGDB_SEARCH_BACKENDS[IGDB_SEARCH_BACKEND]()
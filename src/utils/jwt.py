@@ -1,13 +1,30 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 
+from fastapi import HTTPException, status
 from jose import jwt
 from passlib.hash import bcrypt
 
-from src.config import TOKEN_SECRET_KEY
+from src.config import (
+    PASSWORD_HASH_MAX_PENDING,
+    PASSWORD_HASH_THREADS,
+    TOKEN_SECRET_KEY,
+)
 
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 60 * 24 * 30  # 30 days
 
+# a bcrypt check takes 100-300ms of CPU; bcrypt releases the GIL, so these
+# threads hash in parallel while the event loop keeps serving, and the pool
+# size caps how many run at once
+password_executor = ThreadPoolExecutor(
+    max_workers=PASSWORD_HASH_THREADS, thread_name_prefix="password"
+)
+# the pool queues without limit, so a burst would pile up jobs that finish
+# long after their clients gave up; this bounds the running and waiting ones
+password_jobs = asyncio.Semaphore(PASSWORD_HASH_MAX_PENDING)
+
 
 def create_access_token(data: dict, expires_delta: timedelta | None = None):
     to_encode = data.copy()
@@ -28,3 +45,23 @@ def hash_password(password: str) -> str:
 
 def verify_password(plain: str, hashed: str) -> bool:
     return bcrypt.verify(plain, hashed)
+
+
+async def run_password_job(func, *args):
+    if password_jobs.locked():
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Server is busy, try again",
+            headers={"Retry-After": "1"},
+        )
+    async with password_jobs:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(password_executor, func, *args)
+
+
+async def hash_password_async(password: str) -> str:
+    return await run_password_job(hash_password, password)
+
+
+async def verify_password_async(plain: str, hashed: str) -> bool:
+    return await run_password_job(verify_password, plain, hashed)
@@ -0,0 +1,125 @@
+import os
+import time
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+# with PROMETHEUS_MULTIPROC_DIR set (see docker-entrypoint.sh) every worker
+# writes its samples to mmap'd files there and /metrics sums them, so the
+# scrape sees the whole server whichever worker answers it
+
+HTTP_REQUESTS = Counter(
+    "http_requests_total", "HTTP requests", ["method", "route", "status"]
+)
+HTTP_REQUEST_SECONDS = Histogram(
+    "http_request_duration_seconds", "HTTP request latency", ["method", "route"]
+)
+DB_POOL_CHECKOUT_SECONDS = Histogram(
+    "db_pool_checkout_wait_seconds",
+    "Time spent waiting for a pooled connection",
+    ["engine"],
+    buckets=(0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5, 30),
+)
+DB_POOL_SIZE = Gauge(
+    "db_pool_size",
+    "Connections each pool may hold, overflow included",
+    ["engine"],
+    multiprocess_mode="livesum",
+)
+DB_POOL_CHECKED_OUT = Gauge(
+    "db_pool_checked_out",
+    "Connections currently checked out",
+    ["engine"],
+    multiprocess_mode="livesum",
+)
+STREAM_CHECK_SECONDS = Histogram(
+    "stream_check_duration_seconds",
+    "refresh_stream_statuses run time",
+    ["outcome"],
+    buckets=(0.5, 1, 2, 5, 10, 20, 30, 60, 120, 300),
+)
+RANDOM_ORG_SECONDS = Histogram(
+    "random_org_request_duration_seconds",
+    "random.org API call latency",
+    ["outcome"],
+)
+
+UNMATCHED_ROUTE = "unmatched"
+
+
+class MetricsMiddleware:
+    # plain ASGI, so the response streams through untouched; the route label
+    # is the path template, which keeps player ids out of the series
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+
+        async def send_with_status(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            route = scope.get("route")
+            route_path = getattr(route, "path", UNMATCHED_ROUTE)
+            method = scope["method"]
+            HTTP_REQUEST_SECONDS.labels(method, route_path).observe(
+                time.perf_counter() - start
+            )
+            HTTP_REQUESTS.labels(method, route_path, str(status_code)).inc()
+
+
+class TimedAsyncAdaptedQueuePool(AsyncAdaptedQueuePool):
+    # the default pool of async engines, timing how long connect() waits for
+    # a connection; the pool events only fire once one has been handed out.
+    # The engine label is the pool_logging_name the engine was created with
+    def connect(self):
+        start = time.perf_counter()
+        try:
+            return super().connect()
+        finally:
+            DB_POOL_CHECKOUT_SECONDS.labels(self.logging_name).observe(
+                time.perf_counter() - start
+            )
+
+
+def instrument_pool(
+    engine: AsyncEngine, engine_name: str, max_connections: int | None = None
+):
+    # max_connections is pool_size plus max_overflow, as the engine was given
+    if max_connections is not None:
+        DB_POOL_SIZE.labels(engine_name).set(max_connections)
+
+    checked_out = DB_POOL_CHECKED_OUT.labels(engine_name)
+    event.listen(engine.sync_engine, "checkout", lambda *args: checked_out.inc())
+    event.listen(engine.sync_engine, "checkin", lambda *args: checked_out.dec())
+
+
+def render_metrics() -> tuple[bytes, str]:
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
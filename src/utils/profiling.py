@@ -0,0 +1,221 @@
+import asyncio
+import cProfile
+import io
+import json
+import os
+import pstats
+import re
+import time
+import uuid
+
+from starlette.datastructures import Headers, MutableHeaders
+
+from src.api_models import ProfileCapture, ProfileSqlStatement
+from src.config import PROFILE_DIR, PROFILE_RING_SIZE
+from src.db.sql_stats import current_sql_stats
+from src.enums import Role
+from src.utils.auth import get_principal
+from src.utils.db import utc_now_ts
+from src.utils.structured_logging import current_request_id
+
+try:
+    from pyinstrument import Profiler
+except ImportError:
+    Profiler = None
+
+PROFILE_HEADER = "X-Profile"
+PROFILE_ID_HEADER = "X-Profile-Id"
+CAPTURE_ID = re.compile(r"\d+-[0-9a-f]+")
+# a request that runs away shouldn't fill the disk
+SQL_STATEMENTS_MAX = 5000
+CPROFILE_LINES = 200
+
+
+class RequestProfiler:
+    # pyinstrument follows the request's task across awaits; cProfile sees
+    # the whole thread, so its report also counts whatever else the event
+    # loop ran meanwhile
+    def __init__(self):
+        if Profiler is not None:
+            self.name, self.extension = "pyinstrument", "html"
+            self.profiler = Profiler(async_mode="enabled")
+        else:
+            self.name, self.extension = "cprofile", "txt"
+            self.profiler = cProfile.Profile()
+
+    def start(self):
+        if Profiler is not None:
+            self.profiler.start()
+        else:
+            self.profiler.enable()
+
+    def stop(self):
+        if Profiler is not None:
+            self.profiler.stop()
+        else:
+            self.profiler.disable()
+
+    def render(self) -> str:
+        if Profiler is not None:
+            return self.profiler.output_html()
+        output = io.StringIO()
+        stats = pstats.Stats(self.profiler, stream=output)
+        stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(CPROFILE_LINES)
+        return output.getvalue()
+
+
+def capture_path(capture_id: str, extension: str) -> str:
+    return os.path.join(PROFILE_DIR, f"{capture_id}.{extension}")
+
+
+def save_capture(
+    capture: ProfileCapture,
+    statements: list[ProfileSqlStatement],
+    profiler: RequestProfiler,
+):
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    with open(capture_path(capture.id, profiler.extension), "w") as file:
+        file.write(profiler.render())
+
+    # the metadata goes in last, so a listed capture is always complete
+    metadata_path = capture_path(capture.id, "json")
+    with open(f"{metadata_path}.tmp", "w") as file:
+        json.dump(
+            {
+                "capture": capture.model_dump(),
+                "sql": [statement.model_dump() for statement in statements],
+            },
+            file,
+        )
+    os.replace(f"{metadata_path}.tmp", metadata_path)
+    prune_captures()
+
+
+def capture_ids() -> list[str]:
+    # newest first; ids start with the capture time in milliseconds
+    try:
+        names = os.listdir(PROFILE_DIR)
+    except FileNotFoundError:
+        return []
+    ids = [name.removesuffix(".json") for name in names if name.endswith(".json")]
+    return sorted(ids, key=lambda capture_id: int(capture_id.split("-")[0]))[::-1]
+
+
+def prune_captures():
+    for capture_id in capture_ids()[PROFILE_RING_SIZE:]:
+        for extension in ("json", "html", "txt"):
+            try:
+                os.remove(capture_path(capture_id, extension))
+            except FileNotFoundError:
+                pass
+
+
+def read_capture(capture_id: str) -> dict | None:
+    if not CAPTURE_ID.fullmatch(capture_id):
+        return None
+    try:
+        with open(capture_path(capture_id, "json")) as file:
+            return json.load(file)
+    except FileNotFoundError:
+        return None
+
+
+def list_captures() -> list[ProfileCapture]:
+    captures = []
+    for capture_id in capture_ids():
+        data = read_capture(capture_id)
+        if data is not None:
+            captures.append(ProfileCapture.model_validate(data["capture"]))
+    return captures
+
+
+def capture_report_path(capture: ProfileCapture) -> str:
+    extension = "html" if capture.profiler == "pyinstrument" else "txt"
+    return capture_path(capture.id, extension)
+
+
+def read_capture_report(capture: ProfileCapture) -> bytes | None:
+    # read whole, since prune_captures can remove the file at any moment
+    try:
+        with open(capture_report_path(capture), "rb") as file:
+            return file.read()
+    except FileNotFoundError:
+        return None
+
+
+async def is_admin_request(headers: Headers) -> bool:
+    scheme, _, token = headers.get("authorization", "").partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return False
+    principal = await get_principal(token)
+    return principal is not None and principal.role == Role.ADMIN.value
+
+
+class ProfilingMiddleware:
+    # runs a single request under the profiler when an admin asks for it with
+    # X-Profile: 1; the capture id comes back in X-Profile-Id and the report
+    # and SQL log are served by /api/internal/profiles. One request at a time
+    # per worker, others asking meanwhile are served unprofiled
+    def __init__(self, app):
+        self.app = app
+        self.busy = False
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or self.busy:
+            await self.app(scope, receive, send)
+            return
+        headers = Headers(scope=scope)
+        if headers.get(PROFILE_HEADER) != "1" or not await is_admin_request(headers):
+            await self.app(scope, receive, send)
+            return
+
+        self.busy = True
+        try:
+            await self.profile(scope, receive, send)
+        finally:
+            self.busy = False
+
+    async def profile(self, scope, receive, send):
+        capture_id = f"{time.time_ns() // 1_000_000}-{uuid.uuid4().hex[:8]}"
+        status_code = 500
+
+        async def send_with_profile_id(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                MutableHeaders(scope=message).append(PROFILE_ID_HEADER, capture_id)
+            await send(message)
+
+        sql_stats = current_sql_stats.get()
+        if sql_stats is not None:
+            sql_stats.statement_log = []
+
+        profiler = RequestProfiler()
+        start = time.perf_counter()
+        profiler.start()
+        try:
+            await self.app(scope, receive, send_with_profile_id)
+        finally:
+            profiler.stop()
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            statement_log = (sql_stats.statement_log if sql_stats else None) or []
+            statements = [
+                ProfileSqlStatement(statement=statement, duration_ms=seconds * 1000)
+                for statement, seconds in statement_log[:SQL_STATEMENTS_MAX]
+            ]
+            capture = ProfileCapture(
+                id=capture_id,
+                request_id=current_request_id.get(),
+                method=scope["method"],
+                path=scope["path"],
+                status=status_code,
+                duration_ms=round(elapsed_ms, 1),
+                created_at=utc_now_ts(),
+                profiler=profiler.name,
+                sql_statements=len(statement_log),
+                sql_time_ms=round(
+                    sum(seconds for _, seconds in statement_log) * 1000, 1
+                ),
+            )
+            # rendering and writing happen after the response went out
+            await asyncio.to_thread(save_capture, capture, statements, profiler)
@@ -1,6 +1,7 @@
 import base64
 import json
 import logging
+import time
 import urllib.parse
 from random import randrange
 
@@ -10,8 +11,8 @@ from pydantic import BaseModel
 from src.config import RANDOM_ORG_API_KEY
 from src.db.db_session import get_session
 from src.utils.db import log_error_to_db, utc_now_ts
+from src.utils.metrics import RANDOM_ORG_SECONDS
 
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
@@ -62,17 +63,26 @@ async def get_random_numbers(
         max_retries = 2
 
         while retry_count <= max_retries:
+            start = time.perf_counter()
+            outcome = "error"
             try:
                 async with httpx.AsyncClient(timeout=5.0) as client:
                     response = await client.post(url, headers=headers, json=payload)
+                outcome = str(response.status_code)
                 break
             except httpx.ConnectTimeout:
+                outcome = "timeout"
                 retry_count += 1
                 if retry_count > max_retries:
                     raise
                 logger.warning(
-                    f"Connection timeout on attempt {retry_count}, retrying..."
+                    "Connection timeout on attempt %d, retrying...", retry_count
                 )
+            except httpx.TimeoutException:
+                outcome = "timeout"
+                raise
+            finally:
+                RANDOM_ORG_SECONDS.labels(outcome).observe(time.perf_counter() - start)
 
         if response and response.status_code == 200 and "signature" in response.text:
             response_data = response.json()
@@ -111,7 +121,7 @@ async def get_random_numbers(
                         context=f"num={num}, min_val={min_val}, max_val={max_val}, response_text={response.text[:200] if response else 'None'}",
                     )
             except Exception as db_error:
-                logger.error(f"Failed to log error to database: {db_error}")
+                logger.error("Failed to log error to database: %s", db_error)
 
             data = [randrange(min_val, max_val + 1) for _ in range(num)]
             result = RandomResult(
@@ -124,7 +134,7 @@ async def get_random_numbers(
             return result
 
     except Exception as e:
-        logger.error(f"Dice roll exception: {e}")
+        logger.error("Dice roll exception: %s", e)
 
         try:
             async with get_session() as session:
@@ -136,7 +146,7 @@ async def get_random_numbers(
                     context=f"num={num}, min_val={min_val}, max_val={max_val}",
                 )
         except Exception as db_error:
-            logger.error(f"Failed to log error to database: {db_error}")
+            logger.error("Failed to log error to database: %s", db_error)
 
         data = [randrange(min_val, max_val + 1) for _ in range(num)]
         result = RandomResult(
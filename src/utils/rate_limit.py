@@ -0,0 +1,41 @@
+import time
+from collections import deque
+
+from src.utils.cache import LruCache
+
+ATTEMPT_KEYS_SIZE = 10_000
+
+
+class AttemptLimiter:
+    # sliding window of attempt times per key, kept by each worker; the least
+    # recently seen keys are forgotten first
+    def __init__(self, max_attempts: int, window_seconds: float):
+        self.max_attempts = max_attempts
+        self.window_seconds = window_seconds
+        self.attempts: LruCache[str, deque[float]] = LruCache(ATTEMPT_KEYS_SIZE)
+
+    def _recent(self, key: str, now: float) -> deque[float] | None:
+        attempts = self.attempts.get(key)
+        if attempts is not None:
+            while attempts and attempts[0] <= now - self.window_seconds:
+                attempts.popleft()
+        return attempts
+
+    def retry_after(self, key: str) -> float:
+        # seconds until `key` may attempt again, 0 when it may now
+        now = time.monotonic()
+        attempts = self._recent(key, now)
+        if attempts is None or len(attempts) < self.max_attempts:
+            return 0
+        return attempts[0] + self.window_seconds - now
+
+    def hit(self, key: str):
+        now = time.monotonic()
+        attempts = self._recent(key, now)
+        if attempts is None:
+            attempts = deque()
+            self.attempts.set(key, attempts)
+        attempts.append(now)
+
+    def reset(self, key: str):
+        self.attempts.pop(key)
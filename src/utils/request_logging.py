@@ -0,0 +1,97 @@
+import logging
+import re
+import time
+import uuid
+
+from starlette.datastructures import URL, Headers, MutableHeaders
+
+from src.config import LOG_ERROR_BODY_BYTES
+from src.utils.structured_logging import current_request_id
+
+logger = logging.getLogger(__name__)
+
+REQUEST_ID_HEADER = "X-Request-ID"
+# ids passed in by a proxy are kept when they look like ids
+VALID_REQUEST_ID = re.compile(r"[\w.-]{1,64}")
+
+
+def request_id_for(scope) -> str:
+    request_id = Headers(scope=scope).get(REQUEST_ID_HEADER, "")
+    if VALID_REQUEST_ID.fullmatch(request_id):
+        return request_id
+    return uuid.uuid4().hex
+
+
+class RequestLoggingMiddleware:
+    # logs failed requests with their timing and the head of the error body;
+    # it only watches the messages going out, so responses are never
+    # buffered or rebuilt and streaming bodies stay streaming. Every log line
+    # written while the request runs carries its request id, which is also
+    # returned in X-Request-ID
+    def __init__(self, app, max_body_bytes: int = LOG_ERROR_BODY_BYTES):
+        self.app = app
+        self.max_body_bytes = max_body_bytes
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        request_id = request_id_for(scope)
+        status_code = 0
+        body = bytearray()
+        body_size = 0
+
+        async def send_and_log(message):
+            nonlocal status_code, body_size
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                MutableHeaders(scope=message).append(REQUEST_ID_HEADER, request_id)
+            elif message["type"] == "http.response.body" and status_code >= 400:
+                chunk = message.get("body", b"")
+                body_size += len(chunk)
+                if len(body) < self.max_body_bytes:
+                    body.extend(chunk[: self.max_body_bytes - len(body)])
+                if not message.get("more_body", False):
+                    self.log_failure(scope, status_code, start, body, body_size)
+            await send(message)
+
+        token = current_request_id.set(request_id)
+        try:
+            await self.app(scope, receive, send_and_log)
+        except Exception as e:
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            logger.error(
+                "Middleware error: %s (%.1f ms)",
+                e,
+                elapsed_ms,
+                extra={"duration_ms": round(elapsed_ms, 1)},
+            )
+            raise
+        finally:
+            current_request_id.reset(token)
+
+    def log_failure(
+        self, scope, status_code: int, start: float, body: bytearray, body_size: int
+    ):
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        logger.error(
+            "Failed request: %s %s - Status: %d (%.1f ms)",
+            scope["method"],
+            URL(scope=scope),
+            status_code,
+            elapsed_ms,
+            extra={
+                "method": scope["method"],
+                "path": scope["path"],
+                "status": status_code,
+                "duration_ms": round(elapsed_ms, 1),
+            },
+        )
+        if body:
+            # the cut can land inside a multi-byte character
+            body_text = body.decode(errors="replace")
+            if body_size > len(body):
+                body_text += f"... ({body_size} bytes)"
+            logger.error("Error response body: %s", body_text)
@@ -0,0 +1,73 @@
+import logging
+
+from starlette.datastructures import MutableHeaders
+
+from src.config import IS_LOCAL, SQL_REPEAT_WARN_THRESHOLD
+from src.db.sql_stats import SqlStats, current_sql_stats
+
+logger = logging.getLogger(__name__)
+
+SQL_STATS_HEADERS = ["X-DB-Statements", "X-DB-Time-Ms", "X-DB-Max-Repeats"]
+
+
+class SqlStatsMiddleware:
+    # counts the statements each request runs; locally they come back in the
+    # X-DB-* headers, elsewhere they are logged once the body has gone out.
+    # The headers leave for the client before a streamed body is produced, so
+    # they only count what ran until then; the log line counts everything
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = SqlStats()
+
+        async def send_with_stats(message):
+            if message["type"] == "http.response.start" and IS_LOCAL:
+                _, repeats = stats.most_repeated()
+                headers = MutableHeaders(scope=message)
+                headers["X-DB-Statements"] = str(stats.statements)
+                headers["X-DB-Time-Ms"] = str(round(stats.seconds * 1000, 1))
+                headers["X-DB-Max-Repeats"] = str(repeats)
+            await send(message)
+            if message["type"] == "http.response.body" and not message.get(
+                "more_body", False
+            ):
+                self.log_stats(scope, stats)
+
+        token = current_sql_stats.set(stats)
+        try:
+            await self.app(scope, receive, send_with_stats)
+        finally:
+            current_sql_stats.reset(token)
+
+    def log_stats(self, scope, stats: SqlStats):
+        shape, repeats = stats.most_repeated()
+        db_time_ms = round(stats.seconds * 1000, 1)
+        if not IS_LOCAL and stats.statements:
+            logger.info(
+                "%s %s db_statements=%d db_time_ms=%.1f db_max_repeats=%d",
+                scope["method"],
+                scope["path"],
+                stats.statements,
+                db_time_ms,
+                repeats,
+                extra={
+                    "db_statements": stats.statements,
+                    "db_time_ms": db_time_ms,
+                    "db_max_repeats": repeats,
+                },
+            )
+
+        if repeats > SQL_REPEAT_WARN_THRESHOLD:
+            logger.warning(
+                "Possible N+1 in %s %s: %d x %s",
+                scope["method"],
+                scope["path"],
+                repeats,
+                shape,
+                extra={"sample_key": f"n+1 {shape}"},
+            )
@@ -0,0 +1,15 @@
+import orjson
+from fastapi import Response
+from pydantic import BaseModel
+
+
+class ORJSONModelResponse(Response):
+    # handlers that already build their response model return it wrapped in
+    # this, so FastAPI skips the response_model re-validation and the model
+    # is dumped once; the route keeps response_model for the schema
+    media_type = "application/json"
+
+    def render(self, content) -> bytes:
+        if isinstance(content, BaseModel):
+            content = content.model_dump(mode="json")
+        return orjson.dumps(content)
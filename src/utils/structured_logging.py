@@ -0,0 +1,141 @@
+import atexit
+import copy
+import json
+import logging
+import queue
+import time
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+
+from src.config import LOG_FORMAT, LOG_LEVEL, LOG_SAMPLE_WINDOW_SECONDS
+from src.utils.cache import LruCache
+
+TEXT_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - [%(request_id)s] %(message)s"
+# shown for records logged outside a request
+NO_REQUEST_ID = "-"
+# uvicorn sets these up with handlers of their own that write to stdout
+UVICORN_LOGGERS = ("uvicorn", "uvicorn.error", "uvicorn.access")
+SAMPLE_KEYS_MAX = 4096
+
+# set per request by RequestLoggingMiddleware
+current_request_id: ContextVar[str | None] = ContextVar(
+    "current_request_id", default=None
+)
+
+# everything else on a record came in through extra=
+BLANK_RECORD = logging.LogRecord("", 0, "", 0, "", None, None)
+RECORD_ATTRIBUTES = {*vars(BLANK_RECORD), "message", "asctime", "sample_key"}
+
+listener: QueueListener | None = None
+
+
+class RequestIdFilter(logging.Filter):
+    # runs in the code that logs, where the request's context is current
+    def filter(self, record: logging.LogRecord) -> bool:
+        request_id = current_request_id.get()
+        if request_id is not None:
+            record.request_id = request_id
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    # a record logged with extra={"sample_key": ...} gets through once per key
+    # per window; the next one to get through says how many were dropped
+    def __init__(self, window_seconds: float):
+        super().__init__()
+        self.window_seconds = window_seconds
+        self.windows: LruCache[str, tuple[float, int]] = LruCache(SAMPLE_KEYS_MAX)
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        key = getattr(record, "sample_key", None)
+        if key is None:
+            return True
+
+        now = time.monotonic()
+        window = self.windows.get(key)
+        if window is not None and now - window[0] < self.window_seconds:
+            self.windows.set(key, (window[0], window[1] + 1))
+            return False
+
+        self.windows.set(key, (now, 0))
+        if window is not None and window[1]:
+            record.suppressed = window[1]
+        return True
+
+
+class DeferredQueueHandler(QueueHandler):
+    # QueueHandler.prepare formats the whole record, traceback included, on
+    # the thread that logged it; this only merges the %-args so later changes
+    # to them can't show up, and leaves the rest to the listener thread
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        entry.update(
+            (key, value)
+            for key, value in vars(record).items()
+            if key not in RECORD_ATTRIBUTES
+        )
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class TextFormatter(logging.Formatter):
+    # JSON output carries "suppressed" as a field; here it goes after the
+    # message, ahead of any traceback
+    def __init__(self):
+        super().__init__(TEXT_FORMAT, defaults={"request_id": NO_REQUEST_ID})
+
+    def formatMessage(self, record: logging.LogRecord) -> str:
+        message = super().formatMessage(record)
+        suppressed = getattr(record, "suppressed", 0)
+        if suppressed:
+            message += f" (+{suppressed} suppressed)"
+        return message
+
+
+def setup_logging():
+    # handlers only put records on a queue; a listener thread formats them and
+    # does the blocking write, so a slow stdout never stalls the event loop
+    global listener
+    if listener is not None:
+        return
+
+    stream_handler = logging.StreamHandler()
+    if LOG_FORMAT == "json":
+        stream_handler.setFormatter(JsonFormatter())
+    else:
+        stream_handler.setFormatter(TextFormatter())
+
+    log_queue = queue.SimpleQueue()
+    queue_handler = DeferredQueueHandler(log_queue)
+    queue_handler.addFilter(SamplingFilter(LOG_SAMPLE_WINDOW_SECONDS))
+    queue_handler.addFilter(RequestIdFilter())
+
+    root = logging.getLogger()
+    root.handlers = [queue_handler]
+    root.setLevel(LOG_LEVEL)
+    # uvicorn configures its loggers before it imports the app, so this takes
+    # them over in every worker, access log included
+    for name in UVICORN_LOGGERS:
+        uvicorn_logger = logging.getLogger(name)
+        uvicorn_logger.handlers = []
+        uvicorn_logger.propagate = True
+
+    listener = QueueListener(log_queue, stream_handler)
+    listener.start()
+    # flushes what is still queued
+    atexit.register(listener.stop)
@@ -0,0 +1,81 @@
+import sys
+from array import array
+
+SECONDS_PER_DAY = 60 * 60 * 24
+
+
+def _pack(values: array) -> bytes:
+    if sys.byteorder == "big":
+        values = array("i", values)
+        values.byteswap()
+    return values.tobytes()
+
+
+def _unpack(data: bytes) -> array:
+    values = array("i")
+    values.frombytes(data)
+    if sys.byteorder == "big":
+        values.byteswap()
+    return values
+
+
+def encode_deltas(
+    samples: list[tuple[int, int]], last_ts: int, last_value: int
+) -> bytes:
+    deltas = array("i")
+    for timestamp, value in samples:
+        deltas.append(timestamp - last_ts)
+        deltas.append(value - last_value)
+        last_ts, last_value = timestamp, value
+    return _pack(deltas)
+
+
+def decode_deltas(data: bytes, first_ts: int) -> list[tuple[int, int]]:
+    deltas = _unpack(data)
+    samples = []
+    timestamp, value = first_ts, 0
+    for i in range(0, len(deltas), 2):
+        timestamp += deltas[i]
+        value += deltas[i + 1]
+        samples.append((timestamp, value))
+    return samples
+
+
+def lttb(points: list[tuple[int, int]], threshold: int) -> list[tuple[int, int]]:
+    # Largest-Triangle-Three-Buckets: keeps the first and last points and, from
+    # each bucket in between, the point forming the largest triangle with the
+    # previously kept point and the average of the next bucket
+    if threshold >= len(points) or threshold < 3:
+        return points
+
+    sampled = [points[0]]
+    bucket_size = (len(points) - 2) / (threshold - 2)
+    kept = 0
+
+    for bucket in range(threshold - 2):
+        start = int(bucket * bucket_size) + 1
+        end = int((bucket + 1) * bucket_size) + 1
+
+        next_start = end
+        next_end = min(int((bucket + 2) * bucket_size) + 1, len(points))
+        next_bucket = points[next_start:next_end] or [points[-1]]
+        avg_x = sum(p[0] for p in next_bucket) / len(next_bucket)
+        avg_y = sum(p[1] for p in next_bucket) / len(next_bucket)
+
+        kept_x, kept_y = points[kept]
+        best_area = -1.0
+        best = start
+        for i in range(start, end):
+            x, y = points[i]
+            area = abs(
+                (kept_x - avg_x) * (y - kept_y) - (kept_x - x) * (avg_y - kept_y)
+            )
+            if area > best_area:
+                best_area = area
+                best = i
+
+        sampled.append(points[best])
+        kept = best
+
+    sampled.append(points[-1])
+    return sampled
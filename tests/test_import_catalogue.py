@@ -0,0 +1,36 @@
+import asyncio
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from src.db.db_models import HltbGame
+from src.db.db_setup import HltbGameData
+from src.db.upsert import upsert_statement
+from src.tasks.import_catalogue import INSERT_ONLY_COLUMNS, hltb_row
+
+
+def test_reimport_keeps_created_at():
+    table = HltbGame.__table__
+    fields = HltbGameData.model_fields
+    record = {name: 0 for name, field in fields.items() if field.is_required()}
+    record.update(game_id=1, game_name="Old Name", game_type="game", game_image="")
+    game = HltbGameData.model_validate({**record, "created_at": 100})
+    renamed = HltbGameData.model_validate(
+        {**record, "game_name": "New Name", "created_at": 200, "updated_at": 200}
+    )
+
+    async def run():
+        engine = create_async_engine("sqlite+aiosqlite://")
+        statement = upsert_statement("sqlite", table, ["game_id"], INSERT_ONLY_COLUMNS)
+        async with engine.begin() as conn:
+            await conn.run_sync(table.create)
+            await conn.execute(statement, [hltb_row(game)])
+            await conn.execute(statement, [hltb_row(renamed)])
+            row = (await conn.execute(select(table))).one()
+        await engine.dispose()
+        return row
+
+    row = asyncio.run(run())
+    assert row.game_name == "New Name"
+    assert row.created_at == 100
+    assert row.updated_at == 200